@@ -0,0 +1,79 @@
+"""Compare the UMAP + HDBSCAN and PCA + MiniBatchKMeans clustering backends.
+
+Runs both backends from logic.topic_modeling.build_cluster_models, in the
+reproducible and the fast run mode, on synthetic embeddings with a known
+cluster structure and reports runtime and quality.
+
+Usage: uv run python benchmarks/bench_clustering.py [n_documents ...]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.datasets import make_blobs
+from sklearn.metrics import adjusted_rand_score, silhouette_score
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from logic.topic_modeling import build_cluster_models  # noqa: E402
+
+N_TOPICS = 20
+EMBEDDING_DIM = 768
+
+# The second fast run reuses the cached neighbour graph of the first
+RUNS = [
+    ("umap_hdbscan", "reproducible"),
+    ("umap_hdbscan", "fast"),
+    ("umap_hdbscan", "fast"),
+    ("scalable", "reproducible"),
+    ("scalable", "fast"),
+]
+
+
+def run_backend(backend, mode, embeddings, true_labels):
+    # Timed from model creation, as fast mode builds its neighbour graph there
+    start = time.perf_counter()
+    umap_model, cluster_model = build_cluster_models(
+        N_TOPICS, len(embeddings), backend, mode, embeddings
+    )
+    reduced = umap_model.fit_transform(embeddings)
+    cluster_model.fit(reduced)
+    elapsed = time.perf_counter() - start
+
+    labels = cluster_model.labels_
+    sample = np.random.default_rng(0).choice(
+        len(labels), size=min(5_000, len(labels)), replace=False
+    )
+    clustered = labels[sample] != -1
+    silhouette = (
+        silhouette_score(reduced[sample][clustered], labels[sample][clustered])
+        if len(set(labels[sample][clustered])) > 1
+        else float("nan")
+    )
+    return elapsed, adjusted_rand_score(true_labels, labels), silhouette
+
+
+def main(sizes):
+    print(
+        f"{'documents':>10} {'backend':>13} {'mode':>12} {'seconds':>9} {'ARI':>6} {'silhouette':>10}"
+    )
+    for n_documents in sizes:
+        embeddings, true_labels = make_blobs(
+            n_samples=n_documents,
+            n_features=EMBEDDING_DIM,
+            centers=N_TOPICS,
+            cluster_std=8.0,
+            random_state=0,
+        )
+        embeddings = embeddings.astype(np.float32)
+        for backend, mode in RUNS:
+            elapsed, ari, silhouette = run_backend(backend, mode, embeddings, true_labels)
+            print(
+                f"{n_documents:>10} {backend:>13} {mode:>12} {elapsed:>9.2f} {ari:>6.3f} {silhouette:>10.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 50_000, 100_000])
@@ -0,0 +1,112 @@
+"""Throughput of concurrent analyses with and without thread budgets.
+
+Simulates several sessions running an analysis at the same time, each one a
+thread doing BLAS work (NumPy matmuls), a polars aggregation and, when torch
+is installed, a torch matmul. Every configuration runs in a fresh process,
+because the polars pool is sized at import time:
+
+- default: every library uses all cores (no budgets)
+- managed: configure_process_threads() at startup and thread_budget() per run
+
+Usage: uv run python benchmarks/bench_threads.py [n_sessions ...]
+"""
+
+import os
+import sys
+import json
+import time
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), "..", "src")
+TASKS_PER_SESSION = 8
+
+
+def workload(use_torch):
+    import numpy as np
+    import polars as pl
+
+    rng = np.random.default_rng(0)
+    matrix = rng.random((768, 768), dtype=np.float32)
+    for _ in range(4):
+        matrix = matrix @ matrix.T
+        matrix /= np.abs(matrix).max()
+
+    frame = pl.DataFrame({"key": rng.integers(0, 1_000, 1_000_000), "value": rng.random(1_000_000)})
+    frame.group_by("key").agg(pl.col("value").mean().alias("mean"), pl.col("value").std().alias("std"))
+
+    if use_torch:
+        import torch
+
+        tensor = torch.rand(768, 768)
+        for _ in range(4):
+            tensor = tensor @ tensor.T
+            tensor /= tensor.abs().max()
+
+
+def _torch_available():
+    try:
+        import torch  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def run_worker(mode, n_sessions):
+    """Run n_sessions concurrent sessions in this process and print tasks per second"""
+    sys.path.insert(0, SRC_DIR)
+    from logic.concurrency import configure_process_threads, thread_budget
+
+    if mode == "managed":
+        configure_process_threads()
+    use_torch = _torch_available()
+    workload(use_torch)  # Warm up imports and thread pools
+
+    def session(_):
+        for _ in range(TASKS_PER_SESSION):
+            if mode == "managed":
+                with thread_budget("sentiment"):
+                    workload(use_torch)
+            else:
+                workload(use_torch)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_sessions) as executor:
+        list(executor.map(session, range(n_sessions)))
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"tasks_per_second": n_sessions * TASKS_PER_SESSION / elapsed}))
+
+
+def measure(mode, n_sessions):
+    env = {
+        key: value
+        for key, value in os.environ.items()
+        if key not in ("POLARS_MAX_THREADS", "NUMBA_NUM_THREADS", "TOKENIZERS_PARALLELISM")
+    }
+    env["CEDA_EXPECTED_SESSIONS"] = str(n_sessions)
+    output = subprocess.run(
+        [sys.executable, __file__, "--worker", mode, str(n_sessions)],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])["tasks_per_second"]
+
+
+def main():
+    if sys.argv[1:2] == ["--worker"]:
+        run_worker(sys.argv[2], int(sys.argv[3]))
+        return
+
+    session_counts = [int(arg) for arg in sys.argv[1:]] or [1, 4, 8]
+    print(f"{os.cpu_count()} cores, {TASKS_PER_SESSION} tasks per session")
+    print(f"{'sessions':>8}  {'default':>12}  {'managed':>12}  {'speed-up':>8}")
+    for n_sessions in session_counts:
+        default = measure("default", n_sessions)
+        managed = measure("managed", n_sessions)
+        print(f"{n_sessions:>8}  {default:>10.2f}/s  {managed:>10.2f}/s  {managed / default:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Import-time profile of the app's logic modules.
+
+Imports every module in src/logic in a fresh interpreter with -X importtime
+and reports its cumulative import time plus the slowest packages it pulls in.
+Heavy libraries should only show up once a module's action actually runs.
+
+Usage: uv run python benchmarks/import_profile.py [--output report.txt]
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+LINE_PATTERN = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)")
+
+
+def profile_module(module, top_n=5):
+    """Return (cumulative ms, [(package, cumulative ms), ...]) for one import"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+
+    entries = [
+        (int(match.group(2)), len(match.group(3)), match.group(4))
+        for match in map(LINE_PATTERN.match, completed.stderr.splitlines())
+        if match
+    ]
+    # -X importtime prints children before their parent, one level deeper
+    position = max(i for i, entry in enumerate(entries) if entry[2] == module)
+    total, module_indent, _ = entries[position]
+    timings = []
+    for cumulative, indent, package in reversed(entries[:position]):
+        if indent <= module_indent:
+            break
+        if indent == module_indent + 2 and not module.startswith(package + "."):
+            timings.append((package, cumulative / 1000))
+    timings.sort(key=lambda item: item[1], reverse=True)
+    return total / 1000, timings[:top_n]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="also write the report to this file")
+    args = parser.parse_args()
+
+    modules = sorted(
+        f"logic.{name[:-3]}"
+        for name in os.listdir(os.path.join(SRC_DIR, "logic"))
+        if name.endswith(".py") and name != "__init__.py"
+    )
+
+    lines = [f"{'module':<32} {'import ms':>10}  slowest direct imports"]
+    for module in modules:
+        try:
+            total, slowest = profile_module(module)
+        except RuntimeError as e:
+            lines.append(f"{module:<32} {'failed':>10}  {e}")
+            continue
+        details = ", ".join(f"{package} {ms:.0f}ms" for package, ms in slowest)
+        lines.append(f"{module:<32} {total:>10.0f}  {details}")
+
+    report = "\n".join(lines)
+    print(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
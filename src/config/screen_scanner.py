@@ -1,7 +1,14 @@
 import ast
 import os
+import json
 import streamlit as st
 
+# Optional precomputed page list, written with `python src/config/screen_scanner.py`
+MANIFEST_PATH = "src/config/pages_manifest.json"
+
+# Parsed (title, icon) per page file, keyed on path and reused while the mtime is unchanged
+_page_info_cache = {}
+
 
 def extract_page_info(file_path):
     with open(file_path, "r") as file:
@@ -12,41 +19,85 @@ def extract_page_info(file_path):
         for node in ast.walk(tree):
             if isinstance(node, ast.Assign):
                 for target in node.targets:
-                    if isinstance(target, ast.Name):
-                        if target.id == "title" and isinstance(node.value, ast.Str):
-                            title = node.value.s
-                        elif target.id == "icon" and isinstance(node.value, ast.Str):
-                            icon = node.value.s
+                    if isinstance(target, ast.Name) and isinstance(node.value, ast.Constant):
+                        if target.id == "title" and isinstance(node.value.value, str):
+                            title = node.value.value
+                        elif target.id == "icon" and isinstance(node.value.value, str):
+                            icon = node.value.value
 
         return title, icon
 
 
-def get_screens():
-    screens = []
-    base_dir = "src/screens"
+def cached_page_info(file_path):
+    """Return (title, icon) for a page, only parsing it again when it changed"""
+    mtime = os.path.getmtime(file_path)
+    cached = _page_info_cache.get(file_path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, *extract_page_info(file_path))
+        _page_info_cache[file_path] = cached
+    return cached[1], cached[2]
 
+
+def page_files(base_dir="src/screens"):
+    """Yield (directory, file path) for every page, at most one level deep"""
     for root, _, files in os.walk(base_dir):
         if root.count(os.sep) - base_dir.count(os.sep) <= 1:  # Only go one level deep
-            for file in files:
+            for file in sorted(files):
                 if file.endswith(".py") and file != "__init__.py":
-                    full_path = os.path.join(root, file)
-                    title, icon = extract_page_info(full_path)
-                    subdirectory = os.path.basename(root) if root != base_dir else None
-
-                    screens.append(
-                        {
-                            "path": os.path.relpath(full_path, "src").replace(
-                                "\\", "/"
-                            ),
-                            "title": title,
-                            "icon": icon,
-                            "subdirectory": subdirectory,
-                        }
-                    )
+                    yield root, os.path.join(root, file)
+
+
+def page_mtimes(base_dir="src/screens"):
+    """Modification time per page file; a manifest is only valid for these"""
+    return {
+        os.path.relpath(full_path, "src").replace("\\", "/"): os.path.getmtime(full_path)
+        for _, full_path in page_files(base_dir)
+    }
+
+
+def scan_screens(base_dir="src/screens"):
+    screens = []
+
+    for root, full_path in page_files(base_dir):
+        title, icon = cached_page_info(full_path)
+        subdirectory = os.path.basename(root) if root != base_dir else None
+
+        screens.append(
+            {
+                "path": os.path.relpath(full_path, "src").replace("\\", "/"),
+                "title": title,
+                "icon": icon,
+                "subdirectory": subdirectory,
+            }
+        )
 
     return screens
 
 
+def get_screens(manifest_path=MANIFEST_PATH, base_dir="src/screens"):
+    """Return the page list, from the manifest while it matches the page files
+
+    Pages that were added, removed or edited since the manifest was written
+    make it stale; the pages are then scanned instead.
+    """
+    if manifest_path and os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as file:
+            manifest = json.load(file)
+        if isinstance(manifest, dict) and manifest.get("pages") == page_mtimes(base_dir):
+            return manifest["screens"]
+    return scan_screens(base_dir)
+
+
+def write_manifest(manifest_path=MANIFEST_PATH, base_dir="src/screens"):
+    """Precompute the page list so the app does not parse the pages at all"""
+    screens = scan_screens(base_dir)
+    with open(manifest_path, "w", encoding="utf-8") as file:
+        json.dump(
+            {"pages": page_mtimes(base_dir), "screens": screens}, file, ensure_ascii=False, indent=2
+        )
+    return screens
+
+
 def group_pages_by_subdirectory(pages):
     pages_by_subdirectory = {}
 
@@ -62,3 +113,8 @@ def group_pages_by_subdirectory(pages):
         pages_by_subdirectory[subdirectory].append(page_obj)
 
     return pages_by_subdirectory
+
+
+if __name__ == "__main__":
+    # Run from the repository root: python src/config/screen_scanner.py
+    print(f"Wrote {len(write_manifest())} pages to {MANIFEST_PATH}")
@@ -1,6 +1,4 @@
 import streamlit as st
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
 import pandas as pd
 from logic.remove_stop_words import remove_stopwords
 from collections import Counter
@@ -68,6 +66,9 @@ def generate_wordcloud():
             )
 
             if st.button("Generate Word Cloud"):
+                from wordcloud import WordCloud
+                import matplotlib.pyplot as plt
+
                 try:
                     # Create a copy of word frequencies for exclusion
                     filtered_word_freq = st.session_state.word_freq.copy()
@@ -1,8 +1,15 @@
 import streamlit as st
 import re
+import os
+import json
 import pandas as pd
 import polars as pl
 import requests
+from logic.deduplication import exact_duplicate_groups
+from logic.text_column import TextColumn
+from logic.concurrency import load_once, thread_budget
+
+OUTPUT_DIR = "data/output"
 
 # ---------------------------------------
 # ANONYMIZER LOGIC
@@ -34,24 +41,104 @@ def download_illnesses():
         return set()
 
 
-DUTCH_NAMES = download_dutch_names()
-ILLNESSES = download_illnesses()
+# Lowercase particles that may sit between a first name and a surname
+TUSSENVOEGSELS = {
+    "van", "de", "der", "den", "ter", "ten", "te", "'t", "la", "le", "du", "da", "von",
+}
+
+TOKEN_PATTERN = re.compile(r"[^\W\d_]+(?:['-][^\W\d_]+)*|'t\b")
+
+
+def build_name_index(names):
+    """Build a hash index of name token tuples, keyed by their first token"""
+    index = {}
+    for name in names:
+        tokens = tuple(TOKEN_PATTERN.findall(name.lower()))
+        if tokens:
+            index.setdefault(tokens[0], set()).add(tokens)
+    max_tokens = {
+        first: max(len(tokens) for tokens in entries)
+        for first, entries in index.items()
+    }
+    return index, max_tokens
+
+
+@load_once
+def load_name_index():
+    """Download the Dutch names on first use and index them"""
+    return build_name_index(download_dutch_names())
+
+
+@load_once
+def load_illnesses():
+    """Download the illness list on first use"""
+    return frozenset(download_illnesses())
+
+
+def _is_capitalized(token):
+    return token[0].isupper()
+
+
+def _only_whitespace_between(text, tokens, first, last):
+    """Check that tokens first..last are separated by whitespace only"""
+    return all(
+        text[tokens[i].end() : tokens[i + 1].start()].isspace()
+        for i in range(first, last)
+    )
+
+
+def detect_names(text):
+    """Find name spans in a single pass over the tokens of text"""
+    name_index, name_max_tokens = load_name_index()
+    tokens = list(TOKEN_PATTERN.finditer(text))
+    lowered = [match.group().lower() for match in tokens]
+    spans = []
+    i = 0
+
+    while i < len(tokens):
+        word = lowered[i]
+        if word not in name_index or not _is_capitalized(tokens[i].group()):
+            i += 1
+            continue
+
+        # Longest multi-token name from the index starting at this token
+        length = 1
+        for n in range(min(name_max_tokens[word], len(tokens) - i), 1, -1):
+            if tuple(lowered[i : i + n]) in name_index[word] and (
+                _only_whitespace_between(text, tokens, i, i + n - 1)
+            ):
+                length = n
+                break
+        if length == 1 and (word,) not in name_index[word]:
+            i += 1
+            continue
+
+        # Extend with an optional "van der"-style particle chain and a surname
+        j = i + length
+        while j < len(tokens) and lowered[j] in TUSSENVOEGSELS:
+            j += 1
+        if (
+            j < len(tokens)
+            and _is_capitalized(tokens[j].group())
+            and lowered[j] not in TUSSENVOEGSELS
+            and _only_whitespace_between(text, tokens, i + length - 1, j)
+        ):
+            length = j - i + 1
+
+        end = i + length - 1
+        spans.append(("NAME", tokens[i].start(), tokens[end].end()))
+        i = end + 1
+
+    return spans
 
 
 def detect_sensitive_info(text):
     """Identify names and illnesses more efficiently"""
     text = str(text)
-    sensitive_spans = []
-
-    # Names (Improved regex for potential names)
-    name_pattern = r"\b[A-Z][a-z]+(?:\s[A-Z][a-z]+)?\b"  # Matches "First Last"
-    for match in re.finditer(name_pattern, text):
-        name = match.group().lower()
-        if name in DUTCH_NAMES:
-            sensitive_spans.append(("NAME", match.start(), match.end()))
+    sensitive_spans = detect_names(text)
 
     # Illnesses
-    for illness in ILLNESSES:
+    for illness in load_illnesses():
         for match in re.finditer(
             r"\b" + re.escape(illness) + r"\b", text, re.IGNORECASE
         ):
@@ -60,61 +147,264 @@ def detect_sensitive_info(text):
     return sorted(sensitive_spans, key=lambda x: x[1], reverse=True)
 
 
-def anonymize_text(text, sensitive_spans):
-    """Replace sensitive spans with labels"""
+def merge_spans(sensitive_spans):
+    """Sort spans by offset and merge overlapping ones, keeping the longest label"""
+    merged = []
+    for label, start, end in sorted(sensitive_spans, key=lambda x: (x[1], -x[2])):
+        if merged and start < merged[-1][2]:
+            prev_label, prev_start, prev_end = merged[-1]
+            if end - start > prev_end - prev_start:
+                prev_label = label
+            merged[-1] = (prev_label, prev_start, max(prev_end, end))
+        else:
+            merged.append((label, start, end))
+    return merged
+
+
+def iter_anonymized_segments(text, sensitive_spans):
+    """Lazily yield the slices of the anonymized text for already merged spans"""
+    position = 0
     for label, start, end in sensitive_spans:
-        text = text[:start] + f"[{label}]" + text[end:]
-    return text
+        yield text[position:start]
+        yield f"[{label}]"
+        position = end
+    yield text[position:]
 
 
+def anonymize_text(text, sensitive_spans, offsets_only=False):
+    """Replace sensitive spans with labels
+
+    With offsets_only=True the merged, non-overlapping spans are returned
+    instead, so callers can render the redactions themselves.
+    """
+    spans = merge_spans(sensitive_spans)
+    if offsets_only:
+        return spans
+    return "".join(iter_anonymized_segments(text, spans))
+
+
+def anonymize_record(text):
+    """Anonymize a single text and return it with its detected entities"""
+    sensitive = merge_spans(detect_sensitive_info(text))
+    anonymized = "".join(iter_anonymized_segments(text, sensitive))
+    entities = [{"label": label, "text": text[start:end]} for label, start, end in sensitive]
+    return anonymized, entities
+
+
+@thread_budget("anonymizer")
 def process_dataframe(df, text_column):
     """Process DataFrame with proper type checking for both pandas and polars"""
-    if isinstance(df, pl.DataFrame):
-        df = df.to_pandas(use_pyarrow_extension_array=True)
-    elif not isinstance(df, pd.DataFrame):
+    if not isinstance(df, (pl.DataFrame, pd.DataFrame)):
         raise ValueError("Input must be a pandas or polars DataFrame")
 
-    if df.empty:
+    if len(df) == 0:
         raise ValueError("Input DataFrame is empty")
 
     if text_column not in df.columns:
         raise ValueError(f"Column '{text_column}' not found in DataFrame")
 
-    results = []
-    total_rows = len(df)
+    texts = TextColumn.from_frame(df, text_column).drop_null().to_list("anonymization")
+
+    # Identical answers are anonymized once; only exact matches are collapsed
+    # because near-duplicates would receive another row's text
+    representatives, inverse = exact_duplicate_groups(texts, normalize=False)
+    total_unique = len(representatives)
 
     # Create a progress bar
     progress_bar = st.progress(0)
     status_text = st.empty()
 
-    for index, row in df.iterrows():
+    unique_results = []
+    for i, representative in enumerate(representatives):
         try:
-            text = row[text_column]
-            if pd.isna(text):
-                continue
-            sensitive = detect_sensitive_info(text)
-            anonymized = anonymize_text(str(text), sensitive)
-
-            results.append(
-                {
-                    "original": text,
-                    "anonymized": anonymized,
-                    "detected_entities": [
-                        {"label": label, "text": str(text)[start:end]}
-                        for label, start, end in sensitive
-                    ],
-                }
-            )
+            unique_results.append(anonymize_record(texts[representative]))
         except Exception as e:
-            print(f"Error processing row {index}: {e}")
+            print(f"Error processing text {representative}: {e}")
+            unique_results.append(None)
 
         # Update progress
-        progress = (index + 1) / total_rows
+        progress = (i + 1) / total_unique
         progress_bar.progress(progress)
-        status_text.text(f"Processed {index + 1}/{total_rows} rows")
+        status_text.text(f"Processed {i + 1}/{total_unique} unique texts")
+
+    results = [
+        {
+            "original": text,
+            "anonymized": unique_results[group][0],
+            "detected_entities": unique_results[group][1],
+        }
+        for text, group in zip(texts, inverse)
+        if unique_results[group] is not None
+    ]
 
     # Clear the progress bar and status text
     progress_bar.empty()
     status_text.empty()
 
     return pd.DataFrame(results)
+
+
+# ---------------------------------------
+# STREAMING ANONYMIZATION
+# ---------------------------------------
+
+
+def iter_record_batches(input_path, batch_size, text_column=None):
+    """Yield polars DataFrames of at most batch_size rows from a CSV, Parquet or Excel file
+
+    The text column of a CSV is always read as strings, also when its first
+    rows happen to look numeric.
+    """
+    extension = os.path.splitext(input_path)[1].lower()
+
+    if extension == ".csv":
+        # Infer the schema once and pin it, so every part gets the same dtypes
+        text_schema = {text_column: pl.String} if text_column else None
+        schema = pl.read_csv(
+            input_path, n_rows=batch_size, infer_schema_length=batch_size, schema_overrides=text_schema
+        ).schema
+        reader = pl.read_csv_batched(input_path, batch_size=batch_size, schema_overrides=schema)
+        while True:
+            batches = reader.next_batches(1)
+            if not batches:
+                break
+            yield batches[0]
+    elif extension == ".parquet":
+        import pyarrow.parquet as pq
+
+        for record_batch in pq.ParquetFile(input_path).iter_batches(batch_size=batch_size):
+            yield pl.from_arrow(record_batch)
+    elif extension in (".xlsx", ".xls"):
+        # Excel files can not be read incrementally, only the output is streamed
+        yield from pl.read_excel(input_path).iter_slices(batch_size)
+    else:
+        raise ValueError(f"Unsupported file type: {extension}")
+
+
+def anonymize_batch(batch, text_column):
+    """Add anonymized text and detected entities (as JSON) to a batch"""
+    texts = TextColumn.from_frame(batch, text_column).to_list("anonymization")
+    present = [text for text in texts if text is not None]
+    representatives, inverse = exact_duplicate_groups(present, normalize=False)
+    unique_results = [anonymize_record(present[i]) for i in representatives]
+
+    anonymized_texts = []
+    entity_json = []
+    groups = iter(inverse)
+    for text in texts:
+        if text is None:
+            anonymized_texts.append(None)
+            entity_json.append("[]")
+            continue
+        anonymized, entities = unique_results[next(groups)]
+        anonymized_texts.append(anonymized)
+        entity_json.append(json.dumps(entities, ensure_ascii=False))
+
+    return batch.with_columns(
+        pl.Series("anonymized", anonymized_texts, dtype=pl.String),
+        pl.Series("detected_entities", entity_json, dtype=pl.String),
+    )
+
+
+def _run_fingerprint(input_path, text_column, output_format, batch_size):
+    """Input file and options a checkpoint is only valid for"""
+    stat = os.stat(input_path)
+    return {
+        "input": os.path.abspath(input_path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "text_column": text_column,
+        "output_format": output_format,
+        "batch_size": batch_size,
+    }
+
+
+def _load_checkpoint(checkpoint_path, fingerprint):
+    """Return the checkpoint to resume from, or a fresh one if there is none
+
+    A checkpoint of another input file raises. If the file or the options
+    changed since the checkpoint was written, the earlier parts are stale and
+    the run starts over.
+    """
+    fresh = {**fingerprint, "rows_done": 0, "parts": 0}
+    if not os.path.exists(checkpoint_path):
+        return fresh
+    with open(checkpoint_path, "r", encoding="utf-8") as file:
+        checkpoint = json.load(file)
+    if checkpoint.get("input") != fingerprint["input"]:
+        raise ValueError(f"Checkpoint {checkpoint_path} belongs to another input file")
+    if any(checkpoint.get(key) != value for key, value in fingerprint.items()):
+        target_dir = os.path.dirname(checkpoint_path)
+        for file_name in os.listdir(target_dir):
+            if file_name.startswith("part-"):
+                os.remove(os.path.join(target_dir, file_name))
+        return fresh
+    return checkpoint
+
+
+def _save_checkpoint(checkpoint_path, checkpoint):
+    tmp_path = checkpoint_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(checkpoint, file)
+    os.replace(tmp_path, checkpoint_path)
+
+
+@thread_budget("anonymizer")
+def stream_anonymize_file(
+    input_path,
+    text_column,
+    output_format="parquet",
+    batch_size=10_000,
+    output_dir=OUTPUT_DIR,
+    progress_callback=None,
+):
+    """Anonymize a file batch by batch, writing one part file per batch
+
+    Parts are written to <output_dir>/<name>_anonymized/ and a checkpoint is
+    updated after every part, so a killed run resumes where it stopped. A run
+    only resumes if the input file and the options are unchanged.
+    Returns the output directory, which polars can scan as a whole.
+    """
+    if output_format not in ("parquet", "csv"):
+        raise ValueError("output_format must be 'parquet' or 'csv'")
+
+    name = os.path.splitext(os.path.basename(input_path))[0]
+    target_dir = os.path.join(output_dir, f"{name}_anonymized")
+    os.makedirs(target_dir, exist_ok=True)
+    checkpoint_path = os.path.join(target_dir, "checkpoint.json")
+    checkpoint = _load_checkpoint(
+        checkpoint_path, _run_fingerprint(input_path, text_column, output_format, batch_size)
+    )
+
+    row_offset = 0
+    for batch in iter_record_batches(input_path, batch_size, text_column):
+        batch_end = row_offset + len(batch)
+        if batch_end <= checkpoint["rows_done"]:
+            row_offset = batch_end
+            continue
+        if row_offset < checkpoint["rows_done"]:
+            batch = batch.slice(checkpoint["rows_done"] - row_offset)
+
+        if text_column not in batch.columns:
+            raise ValueError(f"Column '{text_column}' not found in {input_path}")
+
+        result = anonymize_batch(batch, text_column)
+        part_path = os.path.join(
+            target_dir, f"part-{checkpoint['parts']:05d}.{output_format}"
+        )
+        if output_format == "parquet":
+            result.write_parquet(part_path)
+        else:
+            result.write_csv(part_path)
+
+        checkpoint["rows_done"] = batch_end
+        checkpoint["parts"] += 1
+        _save_checkpoint(checkpoint_path, checkpoint)
+        row_offset = batch_end
+
+        if progress_callback is not None:
+            progress_callback(checkpoint["rows_done"])
+
+    checkpoint["complete"] = True
+    _save_checkpoint(checkpoint_path, checkpoint)
+    return target_dir
@@ -0,0 +1,93 @@
+import polars as pl
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from logic.sentiment_analysis import analyze_column, load_calibration
+from logic.text_column import TextColumn
+from logic.topic_modeling import (
+    filter_entries,
+    detect_language,
+    set_stopwords,
+    filter_text,
+    embedding_model_name,
+    fit_documents,
+)
+
+# ---------------------------------------
+# BATCH ANALYSIS LOGIC
+# ---------------------------------------
+
+ANALYSES = ("Sentiment", "Topics")
+
+
+def run_sentiment(df, column):
+    """Sentiment per response of one column, in long format"""
+    frame = df.select(pl.col(column).cast(pl.String)).with_row_index("Row")
+    frame = analyze_column(frame, column, calibration=load_calibration())
+    return frame.rename({column: "Response"})
+
+
+def run_topics(df, column):
+    """Topic per response of one column, in long format"""
+    frame = df.select(pl.col(column)).with_row_index("Row")
+    frame = filter_entries(frame, column, verbose=False)
+    dominant_lang = detect_language(frame, column)
+    frame = filter_text(frame, column, set_stopwords(dominant_lang, []))
+
+    topic_model, topics, _ = fit_documents(
+        TextColumn.from_frame(frame, column).to_list("embedding"),
+        embedding_model_name(dominant_lang),
+        3,
+        "auto",
+    )
+    topic_info = topic_model.get_topic_info()
+    names = dict(zip(topic_info["Topic"], topic_info["Name"]))
+    return frame.rename({column: "Response"}).with_columns(
+        pl.Series("Topic", topics),
+        pl.Series("Topic_Name", [names.get(topic) for topic in topics]),
+    )
+
+
+RUNNERS = {"Sentiment": run_sentiment, "Topics": run_topics}
+
+
+def run_batch(sheets, selection, analyses, max_workers=4, progress_callback=None):
+    """Run the chosen analyses on several sheets and columns over a worker pool
+
+    selection maps a sheet name to the columns to analyse. All tasks share the
+    models loaded by the logic modules and the embedding cache. Returns one
+    combined long-format DataFrame and a list of (sheet, column, analysis, error).
+    """
+    tasks = [
+        (sheet, column, analysis)
+        for sheet, columns in selection.items()
+        for column in columns
+        for analysis in analyses
+    ]
+    results = []
+    errors = []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(RUNNERS[analysis], sheets[sheet], column): (sheet, column, analysis)
+            for sheet, column, analysis in tasks
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            sheet, column, analysis = futures[future]
+            try:
+                results.append(
+                    future.result().with_columns(
+                        pl.lit(sheet).alias("Sheet"),
+                        pl.lit(column).alias("Column"),
+                        pl.lit(analysis).alias("Analysis"),
+                    )
+                )
+            except Exception as e:
+                errors.append((sheet, column, analysis, str(e)))
+            if progress_callback is not None:
+                progress_callback(done, len(tasks))
+
+    if not results:
+        return pl.DataFrame(), errors
+
+    combined = pl.concat(results, how="diagonal_relaxed")
+    leading = ["Sheet", "Column", "Analysis", "Row", "Response"]
+    return combined.select(leading + [c for c in combined.columns if c not in leading]), errors
@@ -0,0 +1,149 @@
+"""Thread budgets for the native thread pools used by the analyses.
+
+Torch, BLAS/OpenMP (through NumPy, scikit-learn and UMAP), numba, polars and
+HF tokenizers all start one thread per core by default. With several sessions
+running analyses at once that oversubscribes the machine, so every analysis
+runs inside thread_budget(stage), which splits the cores between the runs that
+are active in this process.
+
+The torch and BLAS pools are process-wide, so there is one limit for the whole
+process, not one per run. It is recomputed from all active runs whenever a run
+starts or ends and applied as is; nothing is saved and restored per run, as a
+restore would undo the limit set for runs that started later. Numba's limit is
+per thread: a run's thread gets the limit in force when the run starts.
+
+CEDA_MAX_CORES limits the cores the app may use (default: all) and
+CEDA_EXPECTED_SESSIONS sizes the polars pool, which can only be set at startup.
+"""
+
+import os
+import sys
+import warnings
+import threading
+from functools import lru_cache, wraps
+from contextlib import contextmanager
+
+MAX_CORES = int(os.environ.get("CEDA_MAX_CORES", os.cpu_count() or 1))
+EXPECTED_SESSIONS = int(os.environ.get("CEDA_EXPECTED_SESSIONS", 4))
+
+# Share of a run's cores per stage; pure-Python stages need little more than one
+STAGE_SHARES = {
+    "sentiment": 1.0,
+    "embedding": 1.0,
+    "topic_modeling": 1.0,
+    "anonymizer": 0.25,
+}
+
+_lock = threading.Lock()
+_runs = {}  # Active run -> its stage share
+_local = threading.local()
+_configured = False
+
+
+def configure_process_threads():
+    """Size the pools that can not be changed at runtime; call before importing polars
+
+    Values already present in the environment are left alone. The torch,
+    BLAS/OpenMP and numba limits are not set here but by thread_budget, as
+    NumPy has loaded its BLAS library before the app's code runs. Only the
+    first call does anything: Streamlit reruns main.py, and by then polars
+    has been imported on purpose.
+    """
+    global _configured
+    if _configured:
+        return
+    _configured = True
+    if "polars" in sys.modules:
+        warnings.warn("polars was imported before configure_process_threads(); its pool is not limited")
+    os.environ.setdefault("POLARS_MAX_THREADS", str(max(1, MAX_CORES // EXPECTED_SESSIONS)))
+    os.environ.setdefault("NUMBA_NUM_THREADS", str(MAX_CORES))
+    # Tokenizers run inside the worker threads already; a nested Rust pool only competes
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+
+def load_once(loader):
+    """Cache the result of a loader without arguments, loading it only once
+
+    Unlike lru_cache alone, concurrent first calls wait for the one load in
+    progress instead of each loading their own copy of the model.
+    """
+    cached = lru_cache(maxsize=1)(loader)
+    lock = threading.Lock()
+
+    @wraps(loader)
+    def load():
+        with lock:
+            return cached()
+
+    load.cache_clear = cached.cache_clear
+    return load
+
+
+def shared_threads(shares):
+    """Threads per pool while runs with the given stage shares are active"""
+    total = sum(shares)
+    if total == 0:
+        return MAX_CORES
+    return max(1, min(MAX_CORES, int(MAX_CORES / total)))
+
+
+def active_runs():
+    return len(_runs)
+
+
+def apply_thread_limit(threads):
+    """Limit torch, BLAS/OpenMP and numba to the given number of threads
+
+    The limits stay in place until the next call; they are not restored.
+    """
+    from threadpoolctl import threadpool_limits
+
+    threadpool_limits(limits=threads)
+
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(threads)
+
+    if "numba" in sys.modules:
+        numba = sys.modules["numba"]
+        numba.set_num_threads(min(threads, numba.config.NUMBA_NUM_THREADS))
+
+
+def _update_limit():
+    """Apply the limit for the current set of runs; called with _lock held"""
+    threads = shared_threads(_runs.values())
+    apply_thread_limit(threads)
+    return threads
+
+
+@contextmanager
+def thread_budget(stage):
+    """Run a stage as one of the active runs that share the cores
+
+    Nested budgets in the same thread (a stage calling another stage) do not
+    count as another run. Yields the number of threads when the run starts;
+    the limit shrinks and grows while other runs start and end.
+    """
+    share = STAGE_SHARES[stage]
+    if getattr(_local, "depth", 0) > 0:
+        with _lock:
+            threads = shared_threads(_runs.values())
+        _local.depth += 1
+        try:
+            yield threads
+        finally:
+            _local.depth -= 1
+        return
+
+    run = object()
+    with _lock:
+        _runs[run] = share
+        threads = _update_limit()
+
+    _local.depth = 1
+    try:
+        yield threads
+    finally:
+        _local.depth = 0
+        with _lock:
+            del _runs[run]
+            _update_limit()
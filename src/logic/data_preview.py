@@ -0,0 +1,85 @@
+import math
+import polars as pl
+import streamlit as st
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+# ---------------------------------------
+# PAGED DATA PREVIEW
+# ---------------------------------------
+
+
+def page_window(df, page, page_size):
+    """Rows of one page; slicing does not copy the frame"""
+    offset = (page - 1) * page_size
+    if isinstance(df, pl.DataFrame):
+        return df.slice(offset, page_size)
+    return df.iloc[offset : offset + page_size]
+
+
+def apply_row_edits(df, edited_rows, offset=0):
+    """Apply st.data_editor's edited_rows diff to the backing frame
+
+    Only the edited columns are rebuilt; all other columns are shared with the
+    original frame.
+    """
+    if not edited_rows:
+        return df
+
+    edits = {}
+    for row, changes in edited_rows.items():
+        for column, value in changes.items():
+            edits.setdefault(column, {})[offset + int(row)] = value
+
+    if isinstance(df, pl.DataFrame):
+        columns = []
+        for column, values in edits.items():
+            series = df.get_column(column)
+            columns.append(
+                series.scatter(
+                    list(values.keys()),
+                    pl.Series(list(values.values()), dtype=series.dtype, strict=False),
+                )
+            )
+        return df.with_columns(columns)
+
+    df = df.copy(deep=False)
+    for column, values in edits.items():
+        updated = df[column].copy()
+        updated.iloc[list(values.keys())] = list(values.values())
+        df[column] = updated
+    return df
+
+
+def data_preview(key):
+    """Show st.session_state.df one page at a time, with an optional edit mode
+
+    Only the visible page is sent to the browser, so rendering does not depend
+    on the number of rows. In edit mode the page is shown in st.data_editor and
+    every edit is written back to st.session_state.df as a row-level diff.
+    """
+    df = st.session_state.df
+    col1, col2, col3 = st.columns([1, 1, 2])
+    page_size = col1.selectbox("Rows per page", PAGE_SIZES, key=f"{key}_page_size")
+    n_pages = max(math.ceil(len(df) / page_size), 1)
+    if st.session_state.get(f"{key}_page", 1) > n_pages:
+        st.session_state[f"{key}_page"] = n_pages  # The frame shrank, e.g. after filtering
+    page = col2.number_input(
+        f"Page (of {n_pages})", min_value=1, max_value=n_pages, key=f"{key}_page"
+    )
+    edit_mode = col3.toggle("Edit mode", key=f"{key}_edit_mode")
+
+    window = page_window(df, page, page_size)
+    if not edit_mode:
+        st.dataframe(window)
+        return
+
+    offset = (page - 1) * page_size
+    editor_key = f"{key}_editor_{page}_{page_size}"
+
+    def write_back():
+        st.session_state.df = apply_row_edits(
+            st.session_state.df, st.session_state[editor_key]["edited_rows"], offset
+        )
+
+    st.data_editor(window, key=editor_key, on_change=write_back)
@@ -0,0 +1,128 @@
+import re
+import zlib
+import hashlib
+import numpy as np
+
+# ---------------------------------------
+# DEDUPLICATION LOGIC
+# ---------------------------------------
+
+# Large prime for the MinHash permutations (fits in uint64 arithmetic)
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+
+
+def normalize_text(text):
+    """Lowercase text, drop punctuation and collapse whitespace"""
+    text = re.sub(r"[^\w\s]", " ", str(text).lower())
+    return " ".join(text.split())
+
+
+def exact_duplicate_groups(texts, normalize=True):
+    """Group identical texts by hash
+
+    Returns the index of the first occurrence of every group and, for each
+    text, the position of its group in that list.
+    """
+    representatives = []
+    inverse = np.empty(len(texts), dtype=np.int64)
+    groups = {}
+    for i, text in enumerate(texts):
+        key = normalize_text(text) if normalize else str(text)
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        group = groups.get(digest)
+        if group is None:
+            group = groups[digest] = len(representatives)
+            representatives.append(i)
+        inverse[i] = group
+    return representatives, inverse
+
+
+def _shingle_hashes(text, size=5):
+    text = normalize_text(text)
+    if len(text) <= size:
+        return np.array([zlib.crc32(text.encode("utf-8"))], dtype=np.uint64)
+    shingles = {text[i : i + size] for i in range(len(text) - size + 1)}
+    return np.fromiter(
+        (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+
+
+def minhash_signatures(texts, num_perm=64, seed=0):
+    """Compute a MinHash signature per text over character 5-gram shingles"""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint64)
+    for i, text in enumerate(texts):
+        hashes = _shingle_hashes(text)
+        signatures[i] = ((np.outer(a, hashes) + b[:, None]) % MERSENNE_PRIME).min(axis=1)
+    return signatures
+
+
+def _find(parents, i):
+    while parents[i] != i:
+        parents[i] = parents[parents[i]]
+        i = parents[i]
+    return i
+
+
+def near_duplicate_groups(texts, threshold=0.8, num_perm=64, bands=16):
+    """Group near-identical texts with MinHash and locality sensitive hashing
+
+    Texts sharing a band bucket are merged when their estimated Jaccard
+    similarity reaches threshold. Returns the same structure as
+    exact_duplicate_groups.
+    """
+    signatures = minhash_signatures(texts, num_perm)
+    rows = num_perm // bands
+    parents = list(range(len(texts)))
+
+    for band in range(bands):
+        buckets = {}
+        band_values = signatures[:, band * rows : (band + 1) * rows]
+        for i in range(len(texts)):
+            first = buckets.setdefault(band_values[i].tobytes(), i)
+            if first == i:
+                continue
+            if np.mean(signatures[first] == signatures[i]) >= threshold:
+                root_first, root_i = _find(parents, first), _find(parents, i)
+                if root_first != root_i:
+                    parents[max(root_first, root_i)] = min(root_first, root_i)
+
+    representatives = []
+    inverse = np.empty(len(texts), dtype=np.int64)
+    positions = {}
+    for i in range(len(texts)):
+        root = _find(parents, i)
+        if root not in positions:
+            positions[root] = len(representatives)
+            representatives.append(root)
+        inverse[i] = positions[root]
+    return representatives, inverse
+
+
+def deduplicate(texts, near_duplicates=True, threshold=0.8, normalize=True):
+    """Collapse duplicate texts to representatives
+
+    Exact duplicates are grouped by hash first; MinHash/LSH then only runs on
+    the remaining unique texts. Returns (representatives, inverse) where
+    representatives are indices into texts and texts[representatives][inverse]
+    gives every row its representative.
+    """
+    representatives, inverse = exact_duplicate_groups(texts, normalize)
+    if near_duplicates and len(representatives) > 1:
+        unique_texts = [texts[i] for i in representatives]
+        near_representatives, near_inverse = near_duplicate_groups(unique_texts, threshold)
+        representatives = [representatives[i] for i in near_representatives]
+        inverse = near_inverse[inverse]
+    return representatives, inverse
+
+
+def expand(values, inverse):
+    """Fan per-representative results back out to every row"""
+    if isinstance(values, np.ndarray):
+        return values[inverse]
+    return [values[i] for i in inverse]
@@ -0,0 +1,126 @@
+import hashlib
+import numpy as np
+from logic.topic_modeling import embed_deduplicated
+
+# ---------------------------------------
+# DOCUMENT MAP LOGIC
+# ---------------------------------------
+
+# Points sent to the browser per detail level
+MAP_POINT_BUDGET = 10_000
+
+# Above this size the 2D projection is computed with PCA instead of UMAP
+UMAP_PROJECTION_LIMIT = 100_000
+
+# 2D coordinates per set of documents, computed once; oldest evicted first
+PROJECTION_CACHE = {}
+PROJECTION_CACHE_SIZE = 8
+
+
+def _documents_key(model_name, documents):
+    digest = hashlib.blake2b(model_name.encode("utf-8"), digest_size=16)
+    for document in documents:
+        digest.update(document.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def project_documents(model_name, documents):
+    """Project the (cached) document embeddings to 2D once per set of documents"""
+    key = _documents_key(model_name, documents)
+    if key not in PROJECTION_CACHE:
+        from sklearn.decomposition import PCA
+        from umap import UMAP
+
+        embeddings = embed_deduplicated(model_name, documents)
+        if len(documents) > UMAP_PROJECTION_LIMIT:
+            coords = PCA(n_components=2, random_state=42).fit_transform(embeddings)
+        else:
+            coords = UMAP(
+                n_neighbors=15, n_components=2, metric="cosine", random_state=42
+            ).fit_transform(embeddings)
+        if len(PROJECTION_CACHE) >= PROJECTION_CACHE_SIZE:
+            PROJECTION_CACHE.pop(next(iter(PROJECTION_CACHE)))
+        PROJECTION_CACHE[key] = coords.astype(np.float32)
+    return PROJECTION_CACHE[key]
+
+
+def _grid_cells(coords, grid_size):
+    low = coords.min(axis=0)
+    span = np.maximum(coords.max(axis=0) - low, 1e-9)
+    cells = np.minimum(((coords - low) / span * grid_size).astype(np.int64), grid_size - 1)
+    return cells[:, 0] * grid_size + cells[:, 1]
+
+
+def downsample_points(coords, max_points, grid_size=100, seed=0):
+    """Select at most max_points indices, keeping sparse regions visible
+
+    Points are binned on a grid and every cell keeps at most q points, with q
+    as large as the budget allows. Dense clusters are thinned while outlying
+    points survive. Ranks within a cell are fixed by seed, so a larger budget
+    always returns a superset of a smaller one (progressive loading).
+    """
+    if len(coords) <= max_points:
+        return np.arange(len(coords))
+
+    cells = _grid_cells(coords, grid_size)
+    order = np.lexsort((np.random.default_rng(seed).random(len(coords)), cells))
+    sorted_cells = cells[order]
+    cell_starts = np.searchsorted(sorted_cells, sorted_cells, side="left")
+    rank = np.empty(len(coords), dtype=np.int64)
+    rank[order] = np.arange(len(coords)) - cell_starts
+
+    counts = np.bincount(cells)
+    low, high = 0, int(counts.max())
+    while low < high:
+        quota = (low + high + 1) // 2
+        if np.minimum(counts, quota).sum() <= max_points:
+            low = quota
+        else:
+            high = quota - 1
+    return np.flatnonzero(rank < max(low, 1))
+
+
+def density_grid(coords, grid_size=100):
+    """Counts of all documents per grid cell, for the background layer"""
+    counts, x_edges, y_edges = np.histogram2d(coords[:, 0], coords[:, 1], bins=grid_size)
+    return counts.T, (x_edges[:-1] + x_edges[1:]) / 2, (y_edges[:-1] + y_edges[1:]) / 2
+
+
+def document_map_figure(coords, topics, documents, level=1):
+    """Density background of all documents plus a downsampled point layer"""
+    import plotly.graph_objects as go
+
+    indices = downsample_points(coords, MAP_POINT_BUDGET * level)
+    counts, x_centers, y_centers = density_grid(coords)
+    topics = np.asarray(topics)
+
+    fig = go.Figure()
+    fig.add_trace(
+        go.Heatmap(
+            x=x_centers,
+            y=y_centers,
+            z=np.log1p(counts),
+            colorscale="Greys",
+            showscale=False,
+            hoverinfo="skip",
+            opacity=0.5,
+        )
+    )
+    fig.add_trace(
+        go.Scattergl(
+            x=coords[indices, 0],
+            y=coords[indices, 1],
+            mode="markers",
+            marker=dict(size=4, color=topics[indices], colorscale="Viridis"),
+            text=[f"Topic {topics[i]}: {documents[i][:100]}" for i in indices],
+            hoverinfo="text",
+        )
+    )
+    fig.update_layout(
+        title=f"Document map ({len(indices)} of {len(coords)} documents shown)",
+        height=600,
+        xaxis=dict(showticklabels=False),
+        yaxis=dict(showticklabels=False),
+    )
+    return fig, len(indices)
@@ -1,16 +1,27 @@
 import streamlit as st
 import polars as pl
+from logic.session_store import StoredFrames, get_data_store, memory_sidebar
 
 
 def file_handler():
     # File uploader in sidebar
     uploaded_file = st.sidebar.file_uploader("Upload a CSV file", type=["xlsx"])
+    store = get_data_store()
 
     if uploaded_file is not None:
-        # Read CSV into DataFrame
-        st.session_state.df = pl.read_excel(uploaded_file)
+        # Read every sheet once per upload; the first one is the active DataFrame
+        if st.session_state.get("uploaded_file_id") != uploaded_file.file_id:
+            store.clear()
+            for name, sheet in pl.read_excel(uploaded_file, sheet_id=0).items():
+                store.put(f"sheet:{name}", sheet)
+            st.session_state.sheets = StoredFrames(store, "sheet:")
+            st.session_state.df = next(iter(st.session_state.sheets.values()))
+            st.session_state.uploaded_file_id = uploaded_file.file_id
         st.sidebar.success("File uploaded successfully!")
     else:
         st.sidebar.warning("Please upload a file to continue.")
         if "df" not in st.session_state:
             st.session_state.df = None
+            st.session_state.sheets = {}
+
+    memory_sidebar()
@@ -0,0 +1,250 @@
+"""Local inference server that holds the models once for all sessions.
+
+Start it next to the app (from the src directory):
+
+    uv run python -m logic.inference_server --port 8765
+
+and point the app at it with CEDA_INFERENCE_URL=http://127.0.0.1:8765.
+Without that variable every process loads its own models, as before.
+"""
+
+import os
+import json
+import queue
+import hashlib
+import argparse
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import requests
+
+INFERENCE_URL_VARIABLE = "CEDA_INFERENCE_URL"
+
+# ---------------------------------------
+# DYNAMIC MICRO-BATCHING
+# ---------------------------------------
+
+
+class MicroBatcher:
+    """Merge concurrent requests into batches for one model
+
+    Requests are queued; a worker thread takes everything that arrives within
+    max_wait_ms (up to max_batch_size texts), runs run_batch once on the
+    combined texts and hands every caller its own slice of the results.
+    """
+
+    def __init__(self, run_batch, max_batch_size=64, max_wait_ms=10):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.requests = queue.Queue()
+        self.worker = threading.Thread(target=self._work, daemon=True)
+        self.worker.start()
+
+    def submit(self, texts):
+        future = Future()
+        self.requests.put((list(texts), future))
+        return future
+
+    def __call__(self, texts, timeout=None):
+        """Results for texts; raises concurrent.futures.TimeoutError after timeout seconds"""
+        return self.submit(texts).result(timeout)
+
+    def _collect(self):
+        pending = [self.requests.get()]
+        size = len(pending[0][0])
+        while size < self.max_batch_size:
+            try:
+                request = self.requests.get(timeout=self.max_wait)
+            except queue.Empty:
+                break
+            pending.append(request)
+            size += len(request[0])
+        return pending
+
+    def _work(self):
+        while True:
+            pending = self._collect()
+            texts = [text for request_texts, _ in pending for text in request_texts]
+            try:
+                results = self.run_batch(texts)
+                if len(results) != len(texts):
+                    raise ValueError(f"run_batch returned {len(results)} results for {len(texts)} texts")
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+            start = 0
+            for request_texts, future in pending:
+                future.set_result(results[start : start + len(request_texts)])
+                start += len(request_texts)
+
+
+# ---------------------------------------
+# CLIENTS
+# ---------------------------------------
+
+
+class InferenceClient:
+    """Client for a running inference server"""
+
+    def __init__(self, url, timeout=600):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _post(self, endpoint, payload):
+        response = requests.post(f"{self.url}/{endpoint}", json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()["results"]
+
+    def sentiment(self, texts):
+        return [tuple(result) for result in self._post("sentiment", {"texts": list(texts)})]
+
+    def embed(self, model_name, texts):
+        return np.asarray(
+            self._post("embed", {"model": model_name, "texts": list(texts)}),
+            dtype=np.float32,
+        )
+
+
+class FakeInferenceClient:
+    """In-process stand-in for InferenceClient, for tests and offline use
+
+    Uses the same MicroBatcher as the server but with cheap deterministic
+    models, unless real batch functions are passed in.
+    """
+
+    def __init__(self, sentiment_batch=None, embed_batch=None, dimensions=8):
+        self.dimensions = dimensions
+        self.sentiment_batcher = MicroBatcher(sentiment_batch or self._fake_sentiment)
+        self.embed_batch = embed_batch or self._fake_embed
+        self.embed_batchers = {}
+        self.batch_sizes = []
+
+    def _fake_sentiment(self, texts):
+        self.batch_sizes.append(len(texts))
+        return [("Positive" if len(text) % 2 == 0 else "Negative", 0.5) for text in texts]
+
+    @staticmethod
+    def _seed(model_name, text):
+        # Not hash(): string hashes are salted per process
+        digest = hashlib.blake2b(f"{model_name}\0{text}".encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "little")
+
+    def _fake_embed(self, model_name, texts):
+        self.batch_sizes.append(len(texts))
+        return [
+            np.random.default_rng(self._seed(model_name, text)).random(self.dimensions).tolist()
+            for text in texts
+        ]
+
+    def sentiment(self, texts):
+        return [tuple(result) for result in self.sentiment_batcher(texts)]
+
+    def embed(self, model_name, texts):
+        if model_name not in self.embed_batchers:
+            self.embed_batchers[model_name] = MicroBatcher(
+                lambda batch: self.embed_batch(model_name, batch)
+            )
+        return np.asarray(self.embed_batchers[model_name](texts), dtype=np.float32)
+
+
+_client = None
+
+
+def get_inference_client():
+    """Return the configured client, or None when models should run locally
+
+    A client is created from CEDA_INFERENCE_URL on first use; tests can
+    install a FakeInferenceClient with set_inference_client instead.
+    """
+    global _client
+    if _client is None and os.environ.get(INFERENCE_URL_VARIABLE):
+        _client = InferenceClient(os.environ[INFERENCE_URL_VARIABLE])
+    return _client
+
+
+def set_inference_client(client):
+    """Use the given client in this process (None switches back to local models)"""
+    global _client
+    _client = client
+
+
+# ---------------------------------------
+# SERVER
+# ---------------------------------------
+
+
+def sentiment_batch(texts):
+    from logic.sentiment_analysis import classify_tokens
+
+    return classify_tokens(texts)
+
+
+def embed_batch(model_name, texts):
+    from sentence_transformers import SentenceTransformer
+    from logic.topic_modeling import encode_tokens
+
+    if model_name not in _embedding_models:
+        _embedding_models[model_name] = SentenceTransformer(model_name)
+    return encode_tokens(_embedding_models[model_name], texts).tolist()
+
+
+_embedding_models = {}
+
+
+def make_handler(max_batch_size, max_wait_ms):
+    sentiment_batcher = MicroBatcher(sentiment_batch, max_batch_size, max_wait_ms)
+    embed_batchers = {}
+    lock = threading.Lock()
+
+    def embed_batcher(model_name):
+        with lock:
+            if model_name not in embed_batchers:
+                embed_batchers[model_name] = MicroBatcher(
+                    lambda texts: embed_batch(model_name, texts), max_batch_size, max_wait_ms
+                )
+            return embed_batchers[model_name]
+
+    class InferenceHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                if self.path == "/sentiment":
+                    results = sentiment_batcher(payload["texts"])
+                elif self.path == "/embed":
+                    results = embed_batcher(payload["model"])(payload["texts"])
+                else:
+                    self.send_error(404)
+                    return
+                body = json.dumps({"results": results}).encode("utf-8")
+                self.send_response(200)
+            except Exception as e:
+                body = json.dumps({"error": str(e)}).encode("utf-8")
+                self.send_response(500)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return InferenceHandler
+
+
+def serve(host="127.0.0.1", port=8765, max_batch_size=64, max_wait_ms=10):
+    server = ThreadingHTTPServer((host, port), make_handler(max_batch_size, max_wait_ms))
+    print(f"Inference server listening on http://{host}:{port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=int, default=10)
+    args = parser.parse_args()
+    serve(args.host, args.port, args.max_batch_size, args.max_wait_ms)
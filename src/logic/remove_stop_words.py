@@ -1,16 +1,18 @@
-import streamlit as st
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
-import pandas as pd
-from nltk.corpus import stopwords
-import nltk
+from logic.concurrency import load_once
 
-# Download the stopwords dataset
-nltk.download("stopwords")
+
+@load_once
+def load_dutch_stopwords():
+    # Download the stopwords dataset on first use
+    import nltk
+    from nltk.corpus import stopwords
+
+    nltk.download("stopwords")
+    return frozenset(stopwords.words("dutch"))
 
 
 def remove_stopwords(text):
-    stop_words = set(stopwords.words("dutch"))
+    stop_words = load_dutch_stopwords()
     words = text.split()
     filtered_words = [word for word in words if word.lower() not in stop_words]
     return " ".join(filtered_words)
@@ -1,95 +1,497 @@
+import os
+import json
+import logging
 import streamlit as st
-import pandas as pd
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-import matplotlib.pyplot as plt
+import numpy as np
 import polars as pl
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+from logic.deduplication import deduplicate
+from logic.text_column import TextColumn
+from logic.inference_server import get_inference_client
+from logic.concurrency import load_once, thread_budget
+from logic.token_cache import get_token_store, length_sorted_batches, token_windows, padded_batch
+
+logger = logging.getLogger(__name__)
 
 # Initialize models
 model_name = "distilbert-base-multilingual-cased"
-tokenizer = AutoTokenizer.from_pretrained(model_name)
-model = AutoModelForSequenceClassification.from_pretrained(model_name)
-sentiment_pipeline = pipeline(
-    "sentiment-analysis", model=model, tokenizer=tokenizer, device=0
-)
-sentiment_vader = SentimentIntensityAnalyzer()
+
+# Texts per transformer request, and per progress update
+SENTIMENT_BATCH_SIZE = 64
+
+# Tokens per transformer window, special tokens included
+MAX_TOKENS = 512
+
+# Labels are stored as an Enum (one byte per row) and scores as float32
+SENTIMENT_LABELS = ["Positive", "Negative", "Unknown"]
+SENTIMENT_DTYPE = pl.Enum(SENTIMENT_LABELS)
+LABEL_CODES = {label: code for code, label in enumerate(SENTIMENT_LABELS)}
+UNKNOWN = LABEL_CODES["Unknown"]
+
+LABEL_COLUMNS = ["Transformer_Sentiment", "VADER_Sentiment", "sentiment"]
+SCORE_COLUMNS = ["Transformer_Score", "VADER_Score"]
+
+# Histogram edges for the score distributions; covers both [0, 1] and [-1, 1]
+SCORE_BINS = np.linspace(-1, 1, 21).tolist()
+
+CALIBRATION_PATH = "data/output/sentiment_calibration.json"
+
+# Tiered mode: fast models that score every response before the transformer
+FAST_MODELS = ("vader", "hashed")
+
+# Responses labelled by the transformer to train the hashed n-gram model on
+FAST_MODEL_SAMPLE_SIZE = 2_000
+
+# Upper bound on weights x thresholds x rows evaluated at once during calibration
+CALIBRATION_GRID_CELLS = 50_000_000
+
+
+@load_once
+def load_sentiment_pipeline():
+    """Load the transformer pipeline once, only when no inference server is used"""
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer, device=0)
+
+
+def transformer_label(result):
+    label = "Positive" if result["label"] == "POSITIVE" else "Negative"
+    return label, result["score"]
+
+
+@thread_budget("sentiment")
+def classify_tokens(sentences):
+    """Classify sentences with the local transformer, from cached token ids
+
+    Texts longer than one window are split into windows whose class
+    probabilities are averaged, weighted by window length, instead of being
+    truncated. Windows are batched by length to keep padding small.
+    """
+    import torch
+
+    sentiment_pipeline = load_sentiment_pipeline()
+    tokenizer, model = sentiment_pipeline.tokenizer, sentiment_pipeline.model
+    token_ids = get_token_store(tokenizer).add(sentences, tokenizer)
+
+    window_size = MAX_TOKENS - tokenizer.num_special_tokens_to_add()
+    windows, owners = [], []
+    for owner, ids in enumerate(token_ids):
+        for window in token_windows(ids, window_size):
+            windows.append(window)
+            owners.append(owner)
+    lengths = np.array([len(window) for window in windows])
+
+    probabilities = np.zeros((len(windows), model.config.num_labels), dtype=np.float32)
+    for batch in length_sorted_batches(lengths, SENTIMENT_BATCH_SIZE):
+        features = padded_batch(tokenizer, [windows[i] for i in batch], model.device)
+        with torch.inference_mode():
+            logits = model(**features).logits
+        probabilities[batch] = torch.softmax(logits, dim=-1).float().cpu().numpy()
+
+    totals = np.zeros((len(sentences), model.config.num_labels), dtype=np.float32)
+    np.add.at(totals, owners, probabilities * np.maximum(lengths, 1)[:, None])
+    totals /= totals.sum(axis=1, keepdims=True)
+    best = totals.argmax(axis=1)
+    return [
+        transformer_label({"label": model.config.id2label[int(label)], "score": float(totals[i, label])})
+        for i, label in enumerate(best)
+    ]
 
 
 def analyze_sentiment_transformer(sentence):
-    max_length = 512
     try:
-        result = sentiment_pipeline(sentence, truncation=True, max_length=max_length)[0]
-        label = "Positive" if result["label"] == "POSITIVE" else "Negative"
-        score = result["score"]
-        return label, score
+        client = get_inference_client()
+        if client is not None:
+            return client.sentiment([sentence])[0]
+        return classify_tokens([sentence])[0]
     except Exception as e:
         st.error(f"Error processing sentence: {e}")
         return "Unknown", 0.0
 
 
+def analyze_sentiment_transformer_batch(sentences):
+    """Score a batch of sentences, on the inference server when one is configured"""
+    try:
+        client = get_inference_client()
+        if client is not None:
+            return client.sentiment(sentences)
+        return classify_tokens(sentences)
+    except Exception as e:
+        st.error(f"Error processing sentences: {e}")
+        return [("Unknown", 0.0)] * len(sentences)
+
+
+@load_once
+def load_vader():
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+    return SentimentIntensityAnalyzer()
+
+
 def analyze_sentiment_vader(sentence):
-    scores = sentiment_vader.polarity_scores(sentence)
+    scores = load_vader().polarity_scores(sentence)
     label = "Positive" if scores["compound"] >= 0 else "Negative"
     return label, scores["compound"]
 
 
-def perform_sentiment_analysis(df, selected_column):
-    try:
-        column_data = df[selected_column]
-        total_rows = len(column_data)
+def store_results(results, codes, scores, positions):
+    """Write (label, score) tuples into the preallocated code and score arrays"""
+    for position, (label, score) in zip(positions, results):
+        codes[position] = LABEL_CODES.get(label, UNKNOWN)
+        scores[position] = score
+
+
+def label_series(name, codes):
+    return pl.Series(name, codes).replace_strict(
+        list(LABEL_CODES.values()), SENTIMENT_LABELS, return_dtype=SENTIMENT_DTYPE
+    )
+
+
+def score_transformer(texts, positions, codes, scores, progress_callback=None):
+    """Run the transformer on texts[positions] in batches"""
+    for start in range(0, len(positions), SENTIMENT_BATCH_SIZE):
+        batch_positions = positions[start : start + SENTIMENT_BATCH_SIZE]
+        batch = [texts[i] for i in batch_positions]
+        store_results(analyze_sentiment_transformer_batch(batch), codes, scores, batch_positions)
+        if progress_callback is not None:
+            progress_callback(start + len(batch), len(positions))
+
+
+def score_vader(texts, codes, scores):
+    store_results((analyze_sentiment_vader(text) for text in texts), codes, scores, range(len(texts)))
+
+
+@thread_budget("sentiment")
+def analyze_column(
+    df,
+    selected_column,
+    deduplicate_texts=True,
+    progress_callback=None,
+    calibration=None,
+    fast_model=None,
+    confidence_threshold=0.5,
+    near_duplicates=False,
+):
+    """Add transformer, VADER and combined sentiment columns without any UI output
+
+    With fast_model ("vader" or "hashed") the tiered mode of score_tiered is
+    used instead of running the transformer on every response. Only identical
+    texts share a score by default: near-duplicates can differ in a word that
+    flips the sentiment ("would" / "would not recommend"), and case and
+    punctuation carry sentiment too (":)" / ":(").
+    """
+    column = TextColumn.from_frame(df, selected_column)
+    total_rows = len(column)
+
+    # Only score one representative per group of duplicate answers
+    rows = np.flatnonzero(column.is_valid())
+    texts = column.drop_null().to_list("sentiment")
+    if deduplicate_texts:
+        representatives, inverse = deduplicate(texts, near_duplicates=near_duplicates, normalize=False)
+    else:
+        representatives, inverse = np.arange(len(texts)), np.arange(len(texts))
+    unique_texts = [texts[i] for i in representatives]
+
+    if fast_model is None:
+        # Row 0 holds the transformer results, row 1 the VADER results
+        unique_codes = np.full((2, len(unique_texts)), UNKNOWN, dtype=np.uint8)
+        unique_scores = np.zeros((2, len(unique_texts)), dtype=np.float32)
+        score_vader(unique_texts, unique_codes[1], unique_scores[1])
+        score_transformer(
+            unique_texts,
+            np.arange(len(unique_texts)),
+            unique_codes[0],
+            unique_scores[0],
+            progress_callback,
+        )
+    else:
+        unique_codes, unique_scores, unique_escalated = score_tiered(
+            unique_texts, fast_model, confidence_threshold, progress_callback
+        )
+
+    codes = np.full((len(unique_codes), total_rows), UNKNOWN, dtype=np.uint8)
+    scores = np.zeros((len(unique_codes), total_rows), dtype=np.float32)
+    codes[:, rows] = unique_codes[:, inverse]
+    scores[:, rows] = unique_scores[:, inverse]
+
+    df = df.with_columns(
+        label_series("Transformer_Sentiment", codes[0]),
+        pl.Series("Transformer_Score", scores[0]),
+        label_series("VADER_Sentiment", codes[1]),
+        pl.Series("VADER_Score", scores[1]),
+    )
+    if fast_model is None:
+        return df.with_columns(combined_sentiment(calibration))
+
+    # Tiered: the transformer's label where it ran, the fast model's label elsewhere.
+    # Escalated is null for empty responses, which none of the models scored.
+    escalated = np.zeros(total_rows, dtype=bool)
+    escalated[rows] = unique_escalated[inverse]
+    empty_rows = np.setdiff1d(np.arange(total_rows), rows)
+    return df.with_columns(
+        label_series("Fast_Sentiment", codes[2]),
+        pl.Series("Fast_Confidence", scores[2]),
+        pl.Series("Escalated", escalated).scatter(empty_rows, None),
+    ).with_columns(
+        pl.when(pl.col("Escalated") & (pl.col("Transformer_Sentiment") != "Unknown"))
+        .then(pl.col("Transformer_Sentiment"))
+        .otherwise(pl.col("Fast_Sentiment"))
+        .alias("sentiment")
+    )
+
+
+# ---------------------------------------
+# TIERED SENTIMENT
+# ---------------------------------------
+
+
+def train_fast_model(texts, labels):
+    """Linear model on hashed word 1-2 grams; cheap to train and to apply"""
+    from sklearn.feature_extraction.text import HashingVectorizer
+    from sklearn.linear_model import SGDClassifier
+    from sklearn.pipeline import make_pipeline
+
+    model = make_pipeline(
+        HashingVectorizer(ngram_range=(1, 2), n_features=2**20, alternate_sign=False),
+        SGDClassifier(loss="log_loss", random_state=0),
+    )
+    return model.fit(texts, labels)
+
+
+def score_tiered(texts, fast_model, confidence_threshold, progress_callback=None):
+    """Score all texts with a fast model and escalate uncertain ones to the transformer
 
-        transformer_results = []
-        vader_results = []
+    fast_model "vader" uses the VADER compound score, "hashed" a linear model
+    trained on a transformer-labelled sample of the texts. Confidence is
+    |2p - 1| for the fast model's probability p of Positive; texts below
+    confidence_threshold go to the transformer. Returns codes and scores for
+    (transformer, VADER, fast model) plus a mask of the texts the transformer
+    scored.
+    """
+    codes = np.full((3, len(texts)), UNKNOWN, dtype=np.uint8)
+    scores = np.zeros((3, len(texts)), dtype=np.float32)
+    escalated = np.zeros(len(texts), dtype=bool)
+    score_vader(texts, codes[1], scores[1])
+    probability = (scores[1] + 1) / 2
 
+    if fast_model == "hashed" and len(texts) > 0:
+        sample = np.random.default_rng(0).permutation(len(texts))[:FAST_MODEL_SAMPLE_SIZE]
+        score_transformer(texts, sample, codes[0], scores[0])
+        escalated[sample] = True
+        labels = codes[0, sample]
+        known = labels != UNKNOWN
+        if len(np.unique(labels[known])) == 2:
+            model = train_fast_model([texts[i] for i in sample[known]], labels[known])
+            positive = list(model.classes_).index(LABEL_CODES["Positive"])
+            probability = model.predict_proba(texts)[:, positive].astype(np.float32)
+        else:
+            logger.warning("Transformer sample has a single label; falling back to VADER for triage")
+
+    codes[2] = np.where(probability >= 0.5, LABEL_CODES["Positive"], LABEL_CODES["Negative"])
+    scores[2] = np.abs(2 * probability - 1)
+
+    uncertain = np.flatnonzero((scores[2] < confidence_threshold) & ~escalated)
+    score_transformer(texts, uncertain, codes[0], scores[0], progress_callback)
+    escalated[uncertain] = True
+    return codes, scores, escalated
+
+
+def escalation_rate(df):
+    """Share of the non-empty responses that the transformer scored in tiered mode"""
+    if "Escalated" not in df.columns:
+        return 1.0
+    rate = df["Escalated"].mean()  # Nulls (empty responses) are not counted
+    return 0.0 if rate is None else rate
+
+
+def sentiment_summary(df):
+    """Label counts and score histograms of all sentiment columns in one pass
+
+    Returns ({label column: DataFrame[label, count]},
+    {score column: DataFrame[breakpoint, count]}).
+    """
+    summary = (
+        df.lazy()
+        .select(
+            [pl.col(column).value_counts(sort=True).implode() for column in LABEL_COLUMNS]
+            + [
+                pl.col(column).hist(bins=SCORE_BINS, include_breakpoint=True).implode()
+                for column in SCORE_COLUMNS
+            ]
+        )
+        .collect()
+    )
+    counts = {column: summary[column][0].struct.unnest() for column in LABEL_COLUMNS}
+    distributions = {column: summary[column][0].struct.unnest() for column in SCORE_COLUMNS}
+    return counts, distributions
+
+
+# ---------------------------------------
+# ENSEMBLE CALIBRATION
+# ---------------------------------------
+
+
+def positive_probabilities():
+    """Both model outputs as a probability of 'Positive' in [0, 1]"""
+    transformer = (
+        pl.when(pl.col("Transformer_Sentiment") == "Positive")
+        .then(pl.col("Transformer_Score"))
+        .when(pl.col("Transformer_Sentiment") == "Negative")
+        .then(1 - pl.col("Transformer_Score"))
+        .otherwise(0.5)
+    )
+    vader = (pl.col("VADER_Score") + 1) / 2
+    return transformer, vader
+
+
+def both_positive():
+    """Expression for the uncalibrated rule: Positive only when both models agree"""
+    return (pl.col("Transformer_Sentiment") == "Positive") & (pl.col("VADER_Sentiment") == "Positive")
+
+
+def combined_sentiment(calibration=None):
+    """Expression for the combined label: calibrated ensemble, or both models agreeing"""
+    if calibration is None:
+        condition = both_positive()
+    else:
+        transformer, vader = positive_probabilities()
+        weight = calibration["weight"]
+        condition = weight * transformer + (1 - weight) * vader >= calibration["threshold"]
+    return (
+        pl.when(condition)
+        .then(pl.lit("Positive", dtype=SENTIMENT_DTYPE))
+        .otherwise(pl.lit("Negative", dtype=SENTIMENT_DTYPE))
+        .alias("sentiment")
+    )
+
+
+def f1_scores(predictions, truth):
+    """F1 of the positive class along the last axis, for any number of leading axes"""
+    true_positives = (predictions & truth).sum(axis=-1)
+    predicted = predictions.sum(axis=-1)
+    return 2 * true_positives / np.maximum(predicted + truth.sum(), 1)
+
+
+def calibrate_ensemble(df, label_column, weights=None, thresholds=None):
+    """Learn the ensemble weight and decision threshold from labelled rows
+
+    df must contain the sentiment columns of a run without a fast model and
+    a label column holding 'Positive' or 'Negative' (in any case; empty rows
+    are skipped), with at least one row of each. All weight/threshold
+    combinations are scored at once as a (weights, thresholds, rows) array,
+    without a Python loop. baseline_f1 is the F1 of both models agreeing,
+    whatever the current sentiment column holds.
+    """
+    if "Escalated" in df.columns:
+        raise ValueError(
+            "Calibration needs the scores of both models on every row; "
+            "run the sentiment analysis without a fast model first"
+        )
+    weights = np.linspace(0, 1, 101) if weights is None else np.asarray(weights)
+    thresholds = np.linspace(0.05, 0.95, 91).round(2) if thresholds is None else np.asarray(thresholds)
+
+    label = pl.col(label_column).cast(pl.String).str.strip_chars().str.to_lowercase()
+    transformer_probability, vader_probability = positive_probabilities()
+    sample = (
+        df.lazy()
+        .filter(label.is_not_null() & (label != ""))
+        .select(
+            transformer_probability.cast(pl.Float32).alias("transformer"),
+            vader_probability.cast(pl.Float32).alias("vader"),
+            label.alias("label"),
+            both_positive().alias("baseline"),
+        )
+        .collect()
+    )
+
+    other_labels = set(sample["label"].unique()) - {"positive", "negative"}
+    if other_labels:
+        raise ValueError(
+            f"Labels must be 'Positive' or 'Negative', found: {', '.join(sorted(other_labels))}"
+        )
+    truth = (sample["label"] == "positive").to_numpy()
+    if truth.all() or not truth.any():
+        raise ValueError("Calibration needs labelled rows of both classes (Positive and Negative)")
+
+    transformer = sample["transformer"].to_numpy()
+    vader = sample["vader"].to_numpy()
+
+    # Large samples are scored in slices of weights to bound the grid's memory
+    n_slices = -(-len(weights) * len(thresholds) * len(truth) // CALIBRATION_GRID_CELLS)
+    f1 = np.concatenate(
+        [
+            f1_scores(
+                (w[:, None] * transformer + (1 - w[:, None]) * vader)[:, None, :]
+                >= thresholds[None, :, None],
+                truth,
+            )
+            for w in np.array_split(weights, max(n_slices, 1))
+        ]
+    )
+    best_weight, best_threshold = np.unravel_index(np.argmax(f1), f1.shape)
+
+    return {
+        "weight": float(weights[best_weight]),
+        "threshold": float(thresholds[best_threshold]),
+        "f1": float(f1[best_weight, best_threshold]),
+        "baseline_f1": float(f1_scores(sample["baseline"].to_numpy(), truth)),
+        "n_samples": len(sample),
+    }
+
+
+def save_calibration(calibration, path=CALIBRATION_PATH):
+    """Save a calibration for all later runs, only if it beats the AND baseline"""
+    if calibration["f1"] <= calibration["baseline_f1"]:
+        raise ValueError(
+            f"Calibrated F1 {calibration['f1']:.3f} does not beat the baseline "
+            f"{calibration['baseline_f1']:.3f}; the calibration was not saved"
+        )
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(calibration, file, indent=2)
+
+
+def load_calibration(path=CALIBRATION_PATH):
+    """Return the saved calibration, or None when the models are combined with AND"""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def perform_sentiment_analysis(
+    df,
+    selected_column,
+    deduplicate_texts=True,
+    fast_model=None,
+    confidence_threshold=0.5,
+    near_duplicates=False,
+):
+    try:
         # Create a progress bar
         progress_bar = st.progress(0)
         status_text = st.empty()
 
-        for i, text in enumerate(column_data):
-            if pd.notna(text):
-                transformer_results.append(analyze_sentiment_transformer(str(text)))
-                vader_results.append(analyze_sentiment_vader(str(text)))
-            else:
-                transformer_results.append(("Unknown", 0.0))
-                vader_results.append(("Unknown", 0.0))
+        def update_progress(done, total):
+            progress_bar.progress(done / total)
+            status_text.text(f"Scored {done}/{total} unique responses with the transformer")
 
-            # Update progress
-            progress = (i + 1) / total_rows
-            progress_bar.progress(progress)
-            status_text.text(f"Processed {i + 1}/{total_rows} rows")
+        df = analyze_column(
+            df,
+            selected_column,
+            deduplicate_texts,
+            update_progress,
+            load_calibration(),
+            fast_model,
+            confidence_threshold,
+            near_duplicates,
+        )
 
         # Clear the progress bar and status text
         progress_bar.empty()
         status_text.empty()
 
-        df = df.with_columns(
-            [
-                pl.Series(
-                    "Transformer_Sentiment",
-                    [result[0] for result in transformer_results],
-                ),
-                pl.Series(
-                    "Transformer_Score", [result[1] for result in transformer_results]
-                ),
-                pl.Series("VADER_Sentiment", [result[0] for result in vader_results]),
-                pl.Series("VADER_Score", [result[1] for result in vader_results]),
-            ]
-        )
-
-        df = df.with_columns(
-            [
-                pl.when(
-                    (pl.col("Transformer_Sentiment") == "Positive")
-                    & (pl.col("VADER_Sentiment") == "Positive")
-                )
-                .then(pl.lit("Positive"))
-                .otherwise(pl.lit("Negative"))
-                .alias("sentiment")
-            ]
-        )
-
         return df
     except Exception as e:
         st.error(f"Error performing sentiment analysis: {e}")
@@ -97,25 +499,41 @@ def perform_sentiment_analysis(df, selected_column):
 
 
 def visualize_sentiment(df):
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    counts, distributions = sentiment_summary(df)
+
     fig = make_subplots(
-        rows=1,
+        rows=2,
         cols=3,
         subplot_titles=(
             "Transformer Sentiment",
             "VADER Sentiment",
             "Combined Sentiment",
+            "Transformer Score",
+            "VADER Score",
         ),
     )
 
-    for i, column in enumerate(
-        ["Transformer_Sentiment", "VADER_Sentiment", "sentiment"], start=1
-    ):
-        counts = df[column].value_counts().sort(by="counts", descending=True)
+    for i, column in enumerate(LABEL_COLUMNS, start=1):
         fig.add_trace(
-            go.Bar(x=counts["Transformer_Sentiment"], y=counts["counts"], name=column),
+            go.Bar(x=counts[column][column], y=counts[column]["count"], name=column),
             row=1,
             col=i,
         )
+    for i, column in enumerate(SCORE_COLUMNS, start=1):
+        fig.add_trace(
+            go.Bar(
+                x=distributions[column]["breakpoint"],
+                y=distributions[column]["count"],
+                name=column,
+            ),
+            row=2,
+            col=i,
+        )
 
-    fig.update_layout(height=500, width=1000, title_text="Sentiment Analysis Results")
+    fig.update_layout(
+        height=800, width=1000, showlegend=False, title_text="Sentiment Analysis Results"
+    )
     st.plotly_chart(fig)
@@ -0,0 +1,196 @@
+import os
+import time
+import shutil
+import weakref
+import tempfile
+from collections.abc import Mapping
+import pandas as pd
+import polars as pl
+import streamlit as st
+from logic.text_column import copy_report
+
+# Memory a single session may keep in DataFrames before cold frames are spilled
+SESSION_MEMORY_BUDGET_MB = int(os.environ.get("CEDA_SESSION_MEMORY_MB", 512))
+
+SPILL_DIR = "data/output/session_spill"
+
+# ---------------------------------------
+# SESSION DATA STORE
+# ---------------------------------------
+
+
+def frame_size(df):
+    """Estimated in-memory size of a polars or pandas DataFrame in bytes"""
+    if isinstance(df, pl.DataFrame):
+        return df.estimated_size()
+    if isinstance(df, pd.DataFrame):
+        return int(df.memory_usage(deep=True).sum())
+    return 0
+
+
+class SessionDataStore:
+    """Named DataFrames of one session, kept within a memory budget
+
+    When the frames in memory exceed the budget, the least recently used ones
+    are written to Arrow IPC files. Polars frames are read back memory-mapped,
+    so they are backed by the file (and the page cache) instead of the heap.
+    Frames returned by hot_frames (such as the active DataFrame) count towards
+    the budget but are never spilled, as the UI keeps them alive anyway.
+    """
+
+    def __init__(self, budget_mb=SESSION_MEMORY_BUDGET_MB, spill_dir=SPILL_DIR, hot_frames=None):
+        self.budget = budget_mb * 1024**2
+        self.hot_frames = hot_frames or (lambda: [])
+        self.entries = {}
+        self.spill_count = 0
+        os.makedirs(spill_dir, exist_ok=True)
+        self.spill_dir = tempfile.mkdtemp(prefix="session_", dir=spill_dir)
+        weakref.finalize(self, shutil.rmtree, self.spill_dir, True)
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def names(self, prefix=""):
+        return [name for name in self.entries if name.startswith(prefix)]
+
+    def put(self, name, df):
+        self.remove(name)
+        self.entries[name] = {
+            "frame": df,
+            "kind": "polars" if isinstance(df, pl.DataFrame) else "pandas",
+            "state": "memory",
+            "size": frame_size(df),
+            "path": None,
+            "used": time.monotonic(),
+        }
+        self.enforce_budget()
+
+    def get(self, name):
+        entry = self.entries[name]
+        entry["used"] = time.monotonic()
+        frame = entry["frame"]
+        if frame is None:
+            frame = entry["frame"] = self._load(entry)
+            self.enforce_budget()
+        return frame
+
+    def remove(self, name):
+        entry = self.entries.pop(name, None)
+        if entry is not None and entry["path"] is not None:
+            entry["frame"] = None
+            try:
+                os.remove(entry["path"])
+            except OSError:
+                pass  # Still mapped on Windows; removed with the session directory
+
+    def clear(self):
+        for name in list(self.entries):
+            self.remove(name)
+
+    def spill(self, name):
+        """Write a frame to an Arrow IPC file and drop it from memory"""
+        entry = self.entries[name]
+        if entry["path"] is None:
+            self.spill_count += 1
+            entry["path"] = os.path.join(self.spill_dir, f"{self.spill_count}.arrow")
+            if entry["kind"] == "polars":
+                entry["frame"].write_ipc(entry["path"], compression="uncompressed")
+            else:
+                import pyarrow.feather as feather
+
+                feather.write_feather(entry["frame"], entry["path"], compression="uncompressed")
+        entry["frame"] = None
+        entry["state"] = "spilled"
+
+    def _load(self, entry):
+        import pyarrow as pa
+
+        table = pa.ipc.open_file(pa.memory_map(entry["path"])).read_all()
+        if entry["kind"] == "polars":
+            # Zero-copy: the columns stay backed by the mapped file
+            entry["state"] = "mapped"
+            return pl.from_arrow(table)
+        entry["state"] = "memory"
+        return table.to_pandas()
+
+    def memory_usage(self):
+        """Bytes held in memory: stored frames plus hot frames kept outside the store"""
+        hot = [df for df in self.hot_frames() if df is not None]
+        stored = {id(entry["frame"]) for entry in self.entries.values() if entry["frame"] is not None}
+        return sum(
+            entry["size"] for entry in self.entries.values() if entry["state"] == "memory"
+        ) + sum(frame_size(df) for df in hot if id(df) not in stored)
+
+    def enforce_budget(self):
+        """Spill least recently used frames until the session fits its budget"""
+        hot = {id(df) for df in self.hot_frames() if df is not None}
+        usage = self.memory_usage()
+        candidates = sorted(
+            (entry["used"], name)
+            for name, entry in self.entries.items()
+            if entry["state"] == "memory" and id(entry["frame"]) not in hot
+        )
+        for _, name in candidates:
+            if usage <= self.budget:
+                break
+            usage -= self.entries[name]["size"]
+            self.spill(name)
+
+    def report(self):
+        """Size and state per frame, for display"""
+        rows = [
+            {"Frame": name, "MB": entry["size"] / 1024**2, "State": entry["state"]}
+            for name, entry in self.entries.items()
+        ]
+        return pl.DataFrame(rows, schema={"Frame": pl.String, "MB": pl.Float64, "State": pl.String})
+
+
+class StoredFrames(Mapping):
+    """Read-only dict-like view on the frames whose names start with prefix"""
+
+    def __init__(self, store, prefix):
+        self.store = store
+        self.prefix = prefix
+
+    def __getitem__(self, key):
+        if self.prefix + key not in self.store:
+            raise KeyError(key)
+        return self.store.get(self.prefix + key)
+
+    def __iter__(self):
+        return (name[len(self.prefix) :] for name in self.store.names(self.prefix))
+
+    def __len__(self):
+        return len(self.store.names(self.prefix))
+
+
+def get_data_store():
+    """Return the data store of the current session, creating it on first use"""
+    if "data_store" not in st.session_state:
+        st.session_state.data_store = SessionDataStore(
+            hot_frames=lambda: [st.session_state.get("df")]
+        )
+    return st.session_state.data_store
+
+
+def memory_sidebar():
+    """Show the memory used by this session's DataFrames in the sidebar"""
+    store = get_data_store()
+    store.enforce_budget()
+    usage = store.memory_usage()
+
+    with st.sidebar.expander("Memory usage"):
+        st.progress(
+            min(usage / store.budget, 1.0),
+            text=f"{usage / 1024**2:.1f} of {store.budget / 1024**2:.0f} MB in memory",
+        )
+        if store.entries:
+            st.dataframe(store.report(), hide_index=True)
+
+        copies = copy_report()
+        if copies:
+            st.caption("Text values materialized as Python objects, per stage")
+            st.dataframe(
+                pl.DataFrame({"Stage": list(copies), "Values": list(copies.values())}),
+                hide_index=True,
+            )
@@ -0,0 +1,154 @@
+import os
+import json
+import numpy as np
+import polars as pl
+from logic.topic_modeling import embed_documents, clean_text
+
+INDEX_DIR = "data/output/similarity_indexes"
+
+# Below this size a flat (exact) scan is already fast enough
+FLAT_INDEX_LIMIT = 5_000
+
+# ---------------------------------------
+# IVF INDEX
+# ---------------------------------------
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def build_index(embeddings, n_lists=None):
+    """Build an inverted-file (IVF) index for cosine similarity search
+
+    Vectors are grouped per k-means cell and stored contiguously, so a query
+    only scans the cells whose centroids are closest to it.
+    """
+    vectors = _normalize(embeddings)
+    if n_lists is None:
+        n_lists = 1 if len(vectors) <= FLAT_INDEX_LIMIT else int(np.sqrt(len(vectors)))
+
+    if n_lists > 1:
+        from sklearn.cluster import MiniBatchKMeans
+
+        kmeans = MiniBatchKMeans(n_clusters=n_lists, random_state=0, n_init=3)
+        kmeans.fit(vectors)
+        centroids = _normalize(kmeans.cluster_centers_)
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+    else:
+        centroids = vectors.mean(axis=0, keepdims=True)
+        assignments = np.zeros(len(vectors), dtype=np.int64)
+
+    order = np.argsort(assignments, kind="stable")
+    offsets = np.searchsorted(assignments[order], np.arange(n_lists + 1))
+    positions = np.empty(len(order), dtype=np.int64)
+    positions[order] = np.arange(len(order))
+    return {
+        "vectors": vectors[order],
+        "ids": order.astype(np.int64),
+        "positions": positions,
+        "centroids": centroids,
+        "offsets": offsets.astype(np.int64),
+    }
+
+
+def search_index(index, query_vector, k=10, n_probe=8, exclude_id=None):
+    """Return the ids and cosine similarities of the k nearest vectors"""
+    query = _normalize(np.atleast_2d(query_vector))[0]
+    n_probe = min(n_probe, len(index["centroids"]))
+    cells = np.argsort(index["centroids"] @ query)[::-1][:n_probe]
+
+    offsets = index["offsets"]
+    candidates = np.concatenate(
+        [np.arange(offsets[cell], offsets[cell + 1]) for cell in cells]
+    )
+    if exclude_id is not None:
+        candidates = candidates[index["ids"][candidates] != exclude_id]
+    if len(candidates) == 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+
+    scores = index["vectors"][candidates] @ query
+    k = min(k, len(candidates))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return index["ids"][candidates[top]], scores[top]
+
+
+def row_vector(index, row_id):
+    """Look up the stored vector of a document by its original row id"""
+    if "positions" not in index:  # Indexes saved before positions were stored
+        index["positions"] = np.argsort(index["ids"])
+    return index["vectors"][index["positions"][row_id]]
+
+
+# ---------------------------------------
+# PERSISTENCE
+# ---------------------------------------
+
+
+def build_similarity_index(documents, config, name, responses=None, index_dir=INDEX_DIR):
+    """Build an index from (cached) embeddings and store it with its documents
+
+    documents are the preprocessed texts that are embedded; responses are the
+    original texts shown in the results (the documents if not given).
+    """
+    from safetensors.numpy import save_file
+
+    embeddings = embed_documents(config["embedding_model"], documents)
+    index = build_index(embeddings)
+
+    path = os.path.join(index_dir, name)
+    os.makedirs(path, exist_ok=True)
+    save_file(index, os.path.join(path, "index.safetensors"))
+    pl.DataFrame(
+        {"document": documents, "response": responses if responses is not None else documents},
+        schema={"document": pl.String, "response": pl.String},
+    ).write_parquet(os.path.join(path, "documents.parquet"))
+    with open(os.path.join(path, "config.json"), "w", encoding="utf-8") as file:
+        json.dump(config, file, ensure_ascii=False, indent=2)
+
+    return index
+
+
+def list_similarity_indexes(index_dir=INDEX_DIR):
+    """Return the names of all saved similarity indexes"""
+    if not os.path.isdir(index_dir):
+        return []
+    return sorted(
+        name
+        for name in os.listdir(index_dir)
+        if os.path.exists(os.path.join(index_dir, name, "index.safetensors"))
+    )
+
+
+def load_similarity_index(name, index_dir=INDEX_DIR):
+    """Load a saved index, its original responses and its config"""
+    from safetensors.numpy import load_file
+
+    path = os.path.join(index_dir, name)
+    index = load_file(os.path.join(path, "index.safetensors"))
+    stored = pl.read_parquet(os.path.join(path, "documents.parquet"))
+    documents = stored["response" if "response" in stored.columns else "document"]
+    with open(os.path.join(path, "config.json"), "r", encoding="utf-8") as file:
+        config = json.load(file)
+    return index, documents, config
+
+
+def find_similar(index, documents, config, query=None, row_id=None, k=10):
+    """Find the k responses most similar to a query text or an indexed row"""
+    if row_id is not None:
+        query_vector = row_vector(index, row_id)
+    else:
+        cleaned = clean_text(query, set(config.get("stopwords", [])))
+        query_vector = embed_documents(config["embedding_model"], [cleaned])[0]
+
+    ids, scores = search_index(index, query_vector, k=k, exclude_id=row_id)
+    return pl.DataFrame(
+        {
+            "Row": ids,
+            "Similarity": scores,
+            "Response": documents.gather(ids),
+        }
+    )
@@ -0,0 +1,82 @@
+from collections import Counter
+import pandas as pd
+import polars as pl
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# ---------------------------------------
+# ARROW-BACKED TEXT COLUMN
+# ---------------------------------------
+
+# Number of values turned into Python objects (or copied) per stage
+COPY_STATS = Counter()
+
+
+def copy_report():
+    """Return the number of materialized values per stage, largest first"""
+    return dict(COPY_STATS.most_common())
+
+
+class TextColumn:
+    """A text column that stays in Arrow buffers between stages
+
+    Polars and Arrow-backed pandas columns are wrapped without copying. Text
+    is only turned into Python strings per batch, right before a tokenizer or
+    model needs it, and every such conversion is counted in COPY_STATS.
+    """
+
+    def __init__(self, array):
+        if isinstance(array, pa.Array):
+            array = pa.chunked_array([array])
+        self.array = array
+
+    @classmethod
+    def from_frame(cls, df, column):
+        if isinstance(df, pl.DataFrame):
+            series = df.get_column(column)
+            if series.dtype != pl.String:
+                COPY_STATS["cast"] += len(series)
+                series = series.cast(pl.String)
+            return cls(series.to_arrow())
+        if isinstance(df, pd.DataFrame):
+            series = df[column]
+            if isinstance(series.dtype, pd.ArrowDtype):
+                array = pa.array(series)  # Zero-copy: returns the backing chunks
+            else:
+                COPY_STATS["from_pandas"] += len(series)
+                array = pa.chunked_array([pa.array(series.astype("string"), from_pandas=True)])
+            if not pa.types.is_string(array.type) and not pa.types.is_large_string(array.type):
+                COPY_STATS["cast"] += len(array)
+                array = array.cast(pa.large_string())
+            return cls(array)
+        raise ValueError("Input must be a pandas or polars DataFrame")
+
+    def __len__(self):
+        return len(self.array)
+
+    def is_valid(self):
+        """Boolean NumPy mask of the non-null rows"""
+        return pc.is_valid(self.array).to_numpy(zero_copy_only=False)
+
+    def drop_null(self):
+        return TextColumn(self.array.drop_null())
+
+    def iter_batches(self, batch_size, stage):
+        """Yield the column as lists of Python strings, one batch at a time"""
+        for start in range(0, len(self.array), batch_size):
+            batch = self.array.slice(start, batch_size).to_pylist()
+            COPY_STATS[stage] += len(batch)
+            yield batch
+
+    def to_list(self, stage):
+        """Materialize the whole column, for APIs that need a list of strings"""
+        COPY_STATS[stage] += len(self.array)
+        return self.array.to_pylist()
+
+    def to_polars(self, name=""):
+        return pl.Series(name, self.array)
+
+    def to_pandas(self):
+        """Convert at the UI boundary only"""
+        COPY_STATS["to_pandas"] += len(self.array)
+        return self.array.to_pandas(types_mapper=pd.ArrowDtype)
@@ -0,0 +1,157 @@
+import hashlib
+import threading
+from collections import Counter
+import numpy as np
+
+# ---------------------------------------
+# TOKENIZATION CACHE
+# ---------------------------------------
+
+# Texts tokenized versus served from the cache, per tokenizer
+TOKEN_STATS = Counter()
+
+# A store is emptied once it holds more token ids than this (int32, so 4 bytes each)
+TOKEN_STORE_LIMIT = 50_000_000
+
+
+def token_report():
+    """Return the tokenized/reused counts per tokenizer"""
+    return dict(TOKEN_STATS)
+
+
+def _text_digest(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class TokenStore:
+    """Token ids of many texts for one tokenizer, in a single flat int32 buffer
+
+    Text i occupies buffer[offsets[i]:offsets[i + 1]]; texts are found by the
+    hash of their content. Ids are stored without special tokens so callers can
+    truncate or split them into windows before adding those.
+
+    The store is shared by every thread that tokenizes (batch runs, background
+    refits, the inference server), so the buffer is only touched under a lock
+    and callers get copies of the ids, never positions in the buffer.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self._reset()
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def nbytes(self):
+        return self.buffer.nbytes + self.offsets.nbytes
+
+    @property
+    def size(self):
+        return int(self.offsets[self.count])
+
+    def _reset(self):
+        self.positions = {}
+        self.count = 0
+        self.buffer = np.empty(1024, dtype=np.int32)
+        self.offsets = np.zeros(1024, dtype=np.int64)
+
+    def clear(self):
+        with self.lock:
+            self._reset()
+
+    @staticmethod
+    def _grow(array, needed):
+        if needed <= len(array):
+            return array
+        grown = np.empty(max(needed, 2 * len(array)), dtype=array.dtype)
+        grown[: len(array)] = array
+        return grown
+
+    def _append(self, token_ids):
+        lengths = np.fromiter((len(ids) for ids in token_ids), dtype=np.int64, count=len(token_ids))
+        start, end = self.size, self.size + int(lengths.sum())
+        self.buffer = self._grow(self.buffer, end)
+        self.offsets = self._grow(self.offsets, self.count + len(token_ids) + 1)
+        if end > start:
+            self.buffer[start:end] = np.concatenate(token_ids)
+        self.offsets[self.count + 1 : self.count + len(token_ids) + 1] = start + np.cumsum(lengths)
+        self.count += len(token_ids)
+
+    def _ids(self, position):
+        return self.buffer[self.offsets[position] : self.offsets[position + 1]].copy()
+
+    def add(self, texts, tokenizer):
+        """Return the token ids of every text, tokenizing only unseen texts
+
+        Tokenizing happens outside the lock, so threads only wait for each
+        other while the buffer is read or appended to.
+        """
+        digests = [_text_digest(text) for text in texts]
+        with self.lock:
+            found = {
+                digest: self._ids(self.positions[digest])
+                for digest in dict.fromkeys(digests)
+                if digest in self.positions
+            }
+
+        missing = {}
+        for digest, text in zip(digests, texts):
+            if digest not in found and digest not in missing:
+                missing[digest] = text
+        if missing:
+            token_ids = tokenizer(
+                list(missing.values()), add_special_tokens=False, truncation=False
+            )["input_ids"]
+            tokenized = {
+                digest: np.asarray(ids, dtype=np.int32) for digest, ids in zip(missing, token_ids)
+            }
+            with self.lock:
+                if self.size > TOKEN_STORE_LIMIT:
+                    self._reset()
+                # Another thread may have added some of these texts meanwhile
+                unseen = [digest for digest in tokenized if digest not in self.positions]
+                self.positions.update(zip(unseen, range(self.count, self.count + len(unseen))))
+                self._append([tokenized[digest] for digest in unseen])
+            found.update(tokenized)
+
+        with self.lock:
+            TOKEN_STATS[f"{self.name}: tokenized"] += len(missing)
+            TOKEN_STATS[f"{self.name}: reused"] += len(texts) - len(missing)
+        return [found[digest] for digest in digests]
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_token_store(tokenizer):
+    """Return the process-wide store for a tokenizer, keyed on its name"""
+    name = tokenizer.name_or_path
+    with _stores_lock:
+        if name not in _stores:
+            _stores[name] = TokenStore(name)
+        return _stores[name]
+
+
+def length_sorted_batches(lengths, batch_size):
+    """Split indices into batches of similar length, so little padding is needed"""
+    order = np.argsort(lengths, kind="stable")
+    return [order[start : start + batch_size] for start in range(0, len(order), batch_size)]
+
+
+def token_windows(token_ids, window_size):
+    """Split token ids into consecutive windows of at most window_size tokens"""
+    if len(token_ids) == 0:
+        return [token_ids]
+    return [token_ids[start : start + window_size] for start in range(0, len(token_ids), window_size)]
+
+
+def padded_batch(tokenizer, token_ids, device=None):
+    """Add special tokens and pad a batch of token id sequences into model inputs"""
+    features = tokenizer.pad(
+        {"input_ids": [tokenizer.build_inputs_with_special_tokens(ids.tolist()) for ids in token_ids]},
+        return_tensors="pt",
+    )
+    return {key: value.to(device) for key, value in features.items()} if device else dict(features)
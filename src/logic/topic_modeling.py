@@ -1,25 +1,72 @@
 import streamlit as st
 import polars as pl
-from bertopic import BERTopic
-from sentence_transformers import SentenceTransformer
-from umap import UMAP
-from hdbscan import HDBSCAN
-from langdetect import detect, DetectorFactory
+import numpy as np
+import os
+import json
+import hashlib
+import time
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from logic.deduplication import deduplicate, expand
+from logic.text_column import TextColumn
+from logic.inference_server import get_inference_client
+from logic.concurrency import thread_budget
+from logic.token_cache import get_token_store, length_sorted_batches, padded_batch
 from collections import Counter
 import re
-from nltk.corpus import stopwords
-import plotly.graph_objects as go
 
-# Initialize NLTK stopwords
-import nltk
+# Heavy libraries (bertopic, sentence_transformers, umap, hdbscan, sklearn,
+# plotly, nltk, langdetect) are imported inside the functions that use them,
+# so opening a page does not wait for them.
 
-nltk.download("stopwords", quiet=True)
+MODEL_DIR = "data/output/topic_models"
 
-# Set seed for reproducible language detection
-DetectorFactory.seed = 0
+# Embeddings per embedding model, keyed by a digest of the document text;
+# least recently used vectors are evicted beyond EMBEDDING_CACHE_SIZE per model
+EMBEDDING_CACHE = {}
+EMBEDDING_CACHE_SIZE = 200_000
+_embedding_cache_lock = threading.Lock()
 
+# Corpus size from which the PCA + MiniBatchKMeans backend is used automatically
+SCALABLE_BACKEND_THRESHOLD = 100_000
 
-def filter_entries(df, column_of_interest):
+# Vocabulary bounds for the c-TF-IDF topic representation
+VECTORIZER_DEFAULTS = {
+    "min_df": 1,
+    "max_df": 1.0,
+    "max_features": 20_000,
+    "use_hashing": False,
+}
+
+# Charts per (model fingerprint, chart name), oldest evicted first
+FIGURE_CACHE = {}
+FIGURE_CACHE_SIZE = 32
+
+# Upper bound on the number of topics drawn in the topic charts
+MAX_TOPICS_IN_CHARTS = 50
+
+# Single worker so background refits never compete with each other
+REFIT_EXECUTOR = ThreadPoolExecutor(max_workers=1)
+
+# "reproducible": fixed seeds and single-threaded UMAP, for reports;
+# "fast": unseeded parallel UMAP on a cached neighbour graph, for exploration
+RUN_MODES = ("reproducible", "fast")
+RANDOM_SEED = 42
+
+# Fast mode detects the language on a random sample of this many responses
+LANGUAGE_SAMPLE_SIZE = 1_000
+
+# Temporary column holding the responses before preprocessing, for display
+ORIGINAL_TEXT_COLUMN = "__original_text"
+
+# k-nearest-neighbour graphs per set of embeddings, reused by fast-mode UMAP fits
+NEIGHBOUR_GRAPH_CACHE = {}
+NEIGHBOUR_GRAPH_CACHE_SIZE = 4
+
+
+def filter_entries(df, column_of_interest, verbose=True):
     """Filter out numeric or short entries"""
     # Convert the column to string type using pl.String
     filtered_df = df.with_columns(
@@ -36,35 +83,55 @@ def filter_entries(df, column_of_interest):
         (pl.col(column_of_interest).str.len_chars() > 1)                      # Longer than 1 character
     )
 
-    st.write(f"Removed {len(df) - len(filtered_df)} rows (empty, short, or purely numeric).")
-    st.write(f"Remaining rows: {len(filtered_df)}")
+    if verbose:
+        st.write(f"Removed {len(df) - len(filtered_df)} rows (empty, short, or purely numeric).")
+        st.write(f"Remaining rows: {len(filtered_df)}")
 
     return filtered_df
 
 
 
-def detect_language(df, column_of_interest):
+def detect_language(df, column_of_interest, mode="reproducible"):
     """Detect dominant language in the dataset"""
-    languages = (
-        df.select(pl.col(column_of_interest))
-        .to_pandas()[column_of_interest]
-        .apply(lambda x: detect(str(x)) if str(x).strip() != "" else "unknown")
-    )
+    from langdetect import detect, DetectorFactory
+
+    # Set seed for reproducible language detection
+    DetectorFactory.seed = 0
+
+    lang_counter = Counter()
+    if mode == "fast" and len(df) > LANGUAGE_SAMPLE_SIZE:
+        # Seeded, so every call on the same data picks the same language
+        df = df.sample(LANGUAGE_SAMPLE_SIZE, seed=RANDOM_SEED)
+    column = TextColumn.from_frame(df, column_of_interest)
+    for batch in column.iter_batches(10_000, "language_detection"):
+        lang_counter.update(
+            detect(text) if text is not None and text.strip() != "" else "unknown"
+            for text in batch
+        )
 
-    lang_counter = Counter(languages)
     dominant_lang, _ = lang_counter.most_common(1)[0]
     return dominant_lang
 
 
+@lru_cache(maxsize=None)
+def load_stopwords(language):
+    """Download (once) and return the NLTK stopwords for a language"""
+    import nltk
+    from nltk.corpus import stopwords
+
+    nltk.download("stopwords", quiet=True)
+    return frozenset(stopwords.words(language))
+
+
 def set_stopwords(dominant_lang, user_filter_words):
     """Set stopwords based on dominant language"""
     try:
         if dominant_lang.startswith("en"):
-            selected_stopwords = set(stopwords.words("english"))
+            selected_stopwords = set(load_stopwords("english"))
         elif dominant_lang.startswith("nl"):
-            selected_stopwords = set(stopwords.words("dutch"))
+            selected_stopwords = set(load_stopwords("dutch"))
         else:
-            selected_stopwords = set(stopwords.words("english"))
+            selected_stopwords = set(load_stopwords("english"))
 
         return selected_stopwords.union(set(user_filter_words))
     except Exception as e:
@@ -72,29 +139,26 @@ def set_stopwords(dominant_lang, user_filter_words):
         return set()
 
 
-def filter_text(df, column_of_interest, final_stopwords):
-    """Preprocess and filter text data"""
+def clean_text(text, final_stopwords):
+    """Lowercase text, strip punctuation and drop stopwords"""
+    text = re.sub(r"[^\w\s]", "", str(text).lower())
+    return " ".join(word for word in text.split() if word not in final_stopwords)
+
 
-    def preprocess_text(text):
-        text = str(text).lower()
-        text = re.sub(r"[^\w\s]", "", text)
-        return text.split()
+def filter_text(df, column_of_interest, final_stopwords, original_column=None):
+    """Preprocess and filter text data
 
+    With original_column, the text before preprocessing is kept in that column.
+    """
     print(f"Preprocessing text for column: {column_of_interest}")
     print(f"Number of stopwords: {len(final_stopwords)}")
 
+    originals = [pl.col(column_of_interest).alias(original_column)] if original_column else []
     try:
         filtered_df = df.with_columns(
+            *originals,
             pl.col(column_of_interest)
-            .map_elements(
-                lambda text: " ".join(
-                    [
-                        word
-                        for word in preprocess_text(text)
-                        if word not in final_stopwords
-                    ]
-                )
-            )
+            .map_elements(lambda text: clean_text(text, final_stopwords))
             .alias(column_of_interest)
         )
         filtered_df = filtered_df.filter(pl.col(column_of_interest).str.len_chars() > 0)
@@ -104,58 +168,503 @@ def filter_text(df, column_of_interest, final_stopwords):
         raise
 
 
-def pick_embedding_model(dominant_lang):
-    """Select an appropriate SentenceTransformer model based on language"""
+def embedding_model_name(dominant_lang):
+    """Select an appropriate SentenceTransformer model name based on language"""
     if dominant_lang.startswith("en"):
-        model_name = "all-mpnet-base-v2"
-    elif dominant_lang.startswith("nl"):
-        model_name = "paraphrase-multilingual-mpnet-base-v2"
-    else:
-        model_name = "paraphrase-multilingual-mpnet-base-v2"
+        return "all-mpnet-base-v2"
+    return "paraphrase-multilingual-mpnet-base-v2"
+
+
+@st.cache_resource
+def load_embedding_model(model_name):
+    """Load a SentenceTransformer once per process"""
+    from sentence_transformers import SentenceTransformer
 
-    st.write(f"Using embedding model: {model_name}")
     return SentenceTransformer(model_name)
 
 
-def fit_topic_model(df, column_of_interest, min_topic_size, optimal_topics):
-    """Fit the BERTopic model and transform documents"""
-    dominant_lang = detect_language(df, column_of_interest)
-    embedding_model = pick_embedding_model(dominant_lang)
+def bertopic_embedding_model(model_name):
+    """The embedding model to hand to BERTopic
+
+    Embeddings are always passed in precomputed, so with an inference server
+    the model does not have to be loaded in this process at all.
+    """
+    if get_inference_client() is not None:
+        return None
+    return load_embedding_model(model_name)
+
+
+def pick_embedding_model(dominant_lang):
+    """Select an appropriate SentenceTransformer model based on language"""
+    model_name = embedding_model_name(dominant_lang)
+    st.write(f"Using embedding model: {model_name}")
+    return bertopic_embedding_model(model_name)
+
+
+def _text_digest(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+@thread_budget("embedding")
+def encode_tokens(model, documents, batch_size=64):
+    """Encode documents with a SentenceTransformer from cached token ids
+
+    Token ids come from the shared token store, so every unique text is only
+    tokenized once per tokenizer; batches are formed by token length.
+    """
+    import torch
+
+    tokenizer = model.tokenizer
+    token_ids = get_token_store(tokenizer).add(documents, tokenizer)
+    limit = (model.max_seq_length or tokenizer.model_max_length) - tokenizer.num_special_tokens_to_add()
+    lengths = np.array([len(ids) for ids in token_ids], dtype=np.int64)
+
+    vectors = None
+    for batch in length_sorted_batches(np.minimum(lengths, limit), batch_size):
+        features = padded_batch(tokenizer, [token_ids[i][:limit] for i in batch], model.device)
+        with torch.inference_mode():
+            embeddings = model(features)["sentence_embedding"].float().cpu().numpy()
+        if vectors is None:
+            vectors = np.zeros((len(documents), embeddings.shape[1]), dtype=np.float32)
+        vectors[batch] = embeddings
+    return vectors
+
+
+def cached_embeddings(model_name, digests):
+    """Return the cached embeddings among digests, marking them as recently used"""
+    with _embedding_cache_lock:
+        cache = EMBEDDING_CACHE.setdefault(model_name, OrderedDict())
+        found = {}
+        for digest in digests:
+            if digest in cache:
+                cache.move_to_end(digest)
+                found[digest] = cache[digest]
+        return found
+
+
+def store_embeddings(model_name, embeddings):
+    """Add {digest: vector} to a model's cache, evicting the least recently used"""
+    with _embedding_cache_lock:
+        cache = EMBEDDING_CACHE.setdefault(model_name, OrderedDict())
+        for digest, vector in embeddings.items():
+            cache[digest] = vector
+            cache.move_to_end(digest)
+        while len(cache) > EMBEDDING_CACHE_SIZE:
+            cache.popitem(last=False)
+
+
+def embed_documents(model_name, documents):
+    """Embed documents, only encoding texts that are not in the cache yet"""
+    digests = [_text_digest(document) for document in documents]
+    found = cached_embeddings(model_name, digests)
+
+    missing = {}
+    for digest, document in zip(digests, documents):
+        if digest not in found and digest not in missing:
+            missing[digest] = document
+    if missing:
+        client = get_inference_client()
+        if client is not None:
+            vectors = client.embed(model_name, list(missing.values()))
+        else:
+            vectors = encode_tokens(load_embedding_model(model_name), list(missing.values()))
+        encoded = dict(zip(missing.keys(), vectors))
+        store_embeddings(model_name, encoded)
+        found.update(encoded)
+
+    return np.vstack([found[digest] for digest in digests])
+
+
+def use_scalable_backend(n_documents, backend="auto", threshold=SCALABLE_BACKEND_THRESHOLD):
+    """Decide between the UMAP + HDBSCAN and the PCA + MiniBatchKMeans backend"""
+    if backend not in ("auto", "umap_hdbscan", "scalable"):
+        raise ValueError(f"Unknown clustering backend: {backend}")
+    if backend == "auto":
+        return n_documents >= threshold
+    return backend == "scalable"
+
+
+def neighbour_graph(embeddings, n_neighbors):
+    """Cosine kNN graph of the embeddings, computed once per set of embeddings
+
+    A graph for more neighbours is sliced instead of recomputed, as every
+    row is sorted by distance.
+    """
+    from umap.umap_ import nearest_neighbors
+
+    key = hashlib.blake2b(np.ascontiguousarray(embeddings).tobytes(), digest_size=16).digest()
+    cached = NEIGHBOUR_GRAPH_CACHE.get(key)
+    if cached is None or cached[0].shape[1] < n_neighbors:
+        if len(NEIGHBOUR_GRAPH_CACHE) >= NEIGHBOUR_GRAPH_CACHE_SIZE:
+            NEIGHBOUR_GRAPH_CACHE.pop(next(iter(NEIGHBOUR_GRAPH_CACHE)))
+        cached = nearest_neighbors(
+            embeddings,
+            n_neighbors=max(n_neighbors, 10),
+            metric="cosine",
+            metric_kwds={},
+            angular=False,
+            random_state=None,
+            n_jobs=-1,
+        )
+        NEIGHBOUR_GRAPH_CACHE[key] = cached
+    indices, distances, search_index = cached
+    return indices[:, :n_neighbors], distances[:, :n_neighbors], search_index
+
+
+def build_cluster_models(
+    desired_nr_topics, n_documents=0, backend="auto", mode="reproducible", embeddings=None
+):
+    """Create the dimensionality reduction and clustering models for BERTopic
+
+    mode "reproducible" fixes every seed, which also keeps UMAP single-threaded;
+    "fast" leaves them unseeded so UMAP runs in parallel, and reuses a cached
+    neighbour graph of the embeddings when they are given.
+    """
+    if mode not in RUN_MODES:
+        raise ValueError(f"Unknown run mode: {mode}")
+    seed = RANDOM_SEED if mode == "reproducible" else None
+
+    if use_scalable_backend(n_documents, backend):
+        from sklearn.decomposition import PCA
+        from sklearn.cluster import MiniBatchKMeans
+
+        # Linear-time backend: no kNN graph and no density tree over all documents
+        if desired_nr_topics == "auto":
+            n_clusters = int(np.clip(np.sqrt(n_documents) / 4, 2, 100))
+        else:
+            n_clusters = desired_nr_topics
+        umap_model = PCA(n_components=5, svd_solver="randomized", random_state=seed)
+        hdbscan_model = MiniBatchKMeans(
+            n_clusters=n_clusters, batch_size=4096, random_state=seed, n_init=3
+        )
+        return umap_model, hdbscan_model
+
+    from umap import UMAP
+    from hdbscan import HDBSCAN
 
-    # Determine if the user wants auto-detection or a fixed number of topics
-    desired_nr_topics = optimal_topics if isinstance(optimal_topics, int) else "auto"
-    
     # set different UMAP and HDBSCAN parameters based on the mode
+    n_neighbors = 10 if desired_nr_topics == "auto" else 4
+    umap_options = {"n_neighbors": n_neighbors, "n_components": 3, "metric": "cosine"}
+    if mode == "reproducible":
+        umap_options.update(random_state=seed, n_jobs=1)
+    else:
+        umap_options.update(random_state=None, n_jobs=-1, low_memory=False)
+        if embeddings is not None and len(embeddings) > n_neighbors:
+            umap_options["precomputed_knn"] = neighbour_graph(embeddings, n_neighbors)
+
     if desired_nr_topics == "auto":
         # Better parameters for auto mode
-        umap_model = UMAP(n_neighbors=10, n_components=3, metric='cosine', random_state=42)
+        umap_model = UMAP(**umap_options)
         hdbscan_model = HDBSCAN(min_cluster_size=10, min_samples=3, 
                                 metric='euclidean', cluster_selection_method='eom', prediction_data=True)
     else:
         # use manual parameters if a fixed number is provided
-        umap_model = UMAP(n_neighbors=4, n_components=3, metric='cosine', random_state=42)
+        umap_model = UMAP(**umap_options)
         hdbscan_model = HDBSCAN(min_cluster_size=4, min_samples=4, 
                                 metric='euclidean', cluster_selection_method='eom', prediction_data=True)
-    
+    return umap_model, hdbscan_model
+
+
+def hashed_vocabulary(documents, max_features, n_buckets=2**20, chunk_size=10_000):
+    """Pick the max_features most frequent words with bounded memory
+
+    Word counts are accumulated per hash bucket over chunks of documents, so
+    memory is fixed by n_buckets instead of growing with the vocabulary. A
+    second pass maps the selected buckets back to a word.
+    """
+    from sklearn.feature_extraction.text import HashingVectorizer
+    from sklearn.utils import murmurhash3_32
+
+    hasher = HashingVectorizer(n_features=n_buckets, alternate_sign=False, norm=None)
+    counts = np.zeros(n_buckets, dtype=np.float64)
+    for start in range(0, len(documents), chunk_size):
+        counts += np.asarray(hasher.transform(documents[start : start + chunk_size]).sum(axis=0)).ravel()
+
+    top_buckets = np.argsort(counts)[::-1][:max_features]
+    selected = set(top_buckets[counts[top_buckets] > 0].tolist())
+
+    analyzer = hasher.build_analyzer()
+    vocabulary = {}
+    for document in documents:
+        for word in analyzer(document):
+            bucket = abs(murmurhash3_32(word, seed=0)) % n_buckets
+            if bucket in selected:
+                vocabulary[word] = len(vocabulary)
+                selected.discard(bucket)
+        if not selected:
+            break
+    return vocabulary
+
+
+def build_vectorizer(documents, vectorizer_config=None):
+    """Create a CountVectorizer with a bounded vocabulary for c-TF-IDF
+
+    min_df counts topics, as c-TF-IDF vectorizes one document per topic; it is
+    clamped to the number of topics found when the vectorizer is fitted.
+    """
+    from sklearn.feature_extraction.text import CountVectorizer
+    from logic.vectorizers import TopicCountVectorizer
+
+    config = {**VECTORIZER_DEFAULTS, **(vectorizer_config or {})}
+    if config["use_hashing"]:
+        return CountVectorizer(vocabulary=hashed_vocabulary(documents, config["max_features"]))
+    if not isinstance(config["min_df"], int) or config["min_df"] < 1:
+        raise ValueError("min_df must be a positive number of topics")
+    return TopicCountVectorizer(
+        min_df=config["min_df"],
+        max_df=config["max_df"],
+        max_features=config["max_features"],
+    )
+
+
+def ctfidf_memory(topic_model):
+    """Report the vocabulary size and memory of the sparse c-TF-IDF matrix"""
+    matrix = topic_model.c_tf_idf_
+    return {
+        "vocabulary": len(topic_model.vectorizer_model.get_feature_names_out()),
+        "nonzero": matrix.nnz,
+        "megabytes": (matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes) / 1e6,
+    }
+
+
+def embed_deduplicated(model_name, documents):
+    """Embed one representative per group of near-duplicates and fan them out
+
+    Only the representatives are cached: a fanned-out vector belongs to
+    another text, so it is used for this fit only.
+    """
+    representatives, inverse = deduplicate(documents)
+    return expand(
+        embed_documents(model_name, [documents[i] for i in representatives]), inverse
+    )
+
+
+@thread_budget("topic_modeling")
+def fit_documents(
+    documents,
+    model_name,
+    min_topic_size,
+    optimal_topics,
+    backend="auto",
+    deduplicate_texts=True,
+    vectorizer_config=None,
+    mode="reproducible",
+):
+    """Fit a BERTopic model on a list of documents without any UI output"""
+    from bertopic import BERTopic
+    from bertopic.vectorizers import ClassTfidfTransformer
+
+    if deduplicate_texts:
+        embeddings = embed_deduplicated(model_name, documents)
+    else:
+        embeddings = embed_documents(model_name, documents)
+
+    # Determine if the user wants auto-detection or a fixed number of topics
+    desired_nr_topics = optimal_topics if isinstance(optimal_topics, int) else "auto"
+    scalable = use_scalable_backend(len(documents), backend)
+    umap_model, hdbscan_model = build_cluster_models(
+        desired_nr_topics,
+        len(documents),
+        "scalable" if scalable else "umap_hdbscan",
+        mode,
+        embeddings,
+    )
+
     topic_model = BERTopic(
-        embedding_model=embedding_model,
+        embedding_model=bertopic_embedding_model(model_name),
         min_topic_size=min_topic_size,
         verbose=True,
         umap_model=umap_model,
         hdbscan_model=hdbscan_model,
+        vectorizer_model=build_vectorizer(documents, vectorizer_config),
+        ctfidf_model=ClassTfidfTransformer(),
     )
 
-    documents = df[column_of_interest].to_list()
-    topics, probabilities = topic_model.fit_transform(documents)
+    topics, probabilities = topic_model.fit_transform(documents, embeddings)
     
     # if a fixed number of topics was provided, reduce topics accordingly
-    if desired_nr_topics != "auto":
+    # (k-means already produces exactly that many clusters)
+    if desired_nr_topics != "auto" and not scalable:
         topic_model = topic_model.reduce_topics(documents, nr_topics=desired_nr_topics)
-        topics = topic_model.transform(documents)[0]
+        topics = topic_model.transform(documents, embeddings)[0]
 
     return topic_model, topics, probabilities
 
 
+def fit_topic_model(
+    df,
+    column_of_interest,
+    min_topic_size,
+    optimal_topics,
+    backend="auto",
+    vectorizer_config=None,
+    mode="reproducible",
+    dominant_lang=None,
+):
+    """Fit the BERTopic model and transform documents
+
+    Pass dominant_lang when it is already known, so the language (and with it
+    the embedding model) is not detected a second time.
+    """
+    if dominant_lang is None:
+        dominant_lang = detect_language(df, column_of_interest, mode)
+    pick_embedding_model(dominant_lang)
+
+    documents = TextColumn.from_frame(df, column_of_interest).to_list("embedding")
+    if use_scalable_backend(len(documents), backend):
+        st.write("Using the scalable PCA + MiniBatchKMeans clustering backend")
+    return fit_documents(
+        documents,
+        embedding_model_name(dominant_lang),
+        min_topic_size,
+        optimal_topics,
+        backend,
+        vectorizer_config=vectorizer_config,
+        mode=mode,
+    )
+
+
+# ---------------------------------------
+# INCREMENTAL TOPIC MODELING
+# ---------------------------------------
+
+
+def create_online_topic_model(model_name, n_topics, stopwords=None):
+    """Create a BERTopic model that supports partial_fit on mini-batches
+
+    UMAP and HDBSCAN are replaced by IncrementalPCA and MiniBatchKMeans, and
+    the vocabulary is kept bounded by a decaying online vectorizer.
+    """
+    from bertopic import BERTopic
+    from bertopic.vectorizers import OnlineCountVectorizer
+    from sklearn.decomposition import IncrementalPCA
+    from sklearn.cluster import MiniBatchKMeans
+
+    return BERTopic(
+        embedding_model=bertopic_embedding_model(model_name),
+        umap_model=IncrementalPCA(n_components=5),
+        hdbscan_model=MiniBatchKMeans(n_clusters=n_topics, random_state=0, n_init=3),
+        vectorizer_model=OnlineCountVectorizer(
+            stop_words=sorted(stopwords) if stopwords else None, decay=0.01
+        ),
+    )
+
+
+def prepare_documents(df, selected_column):
+    """Filter and preprocess a column
+
+    Returns the preprocessed documents (for embedding), the original responses
+    they came from (for display), the language and the stopwords.
+    """
+    df_filtered = filter_entries(df, selected_column)
+    dominant_lang = detect_language(df_filtered, selected_column)
+    final_stopwords = set_stopwords(dominant_lang, [])
+    df_filtered = filter_text(df_filtered, selected_column, final_stopwords, ORIGINAL_TEXT_COLUMN)
+    documents = TextColumn.from_frame(df_filtered, selected_column).to_list("embedding")
+    return documents, df_filtered[ORIGINAL_TEXT_COLUMN].to_list(), dominant_lang, final_stopwords
+
+
+@thread_budget("topic_modeling")
+def partial_fit_topic_model(topic_model, model_name, documents):
+    """Update an online topic model with one batch and return its topics"""
+    n_topics = topic_model.hdbscan_model.n_clusters
+    if len(documents) < max(n_topics, topic_model.umap_model.n_components):
+        raise ValueError(
+            f"A batch needs at least {n_topics} documents to update the model"
+        )
+
+    embeddings = embed_documents(model_name, documents)
+    topic_model.partial_fit(documents, embeddings)
+    return topic_model, topic_model.topics_
+
+
+def schedule_full_refit(documents, model_name, min_topic_size, optimal_topics):
+    """Refit a full model on all documents in the background and return a Future"""
+    return REFIT_EXECUTOR.submit(
+        fit_documents, list(documents), model_name, min_topic_size, optimal_topics
+    )
+
+
+def save_topic_model(topic_model, config, name, documents=None, model_dir=MODEL_DIR):
+    """Persist a fitted model with its preprocessing config and cached embeddings
+
+    The model is stored with safetensors serialization; the embeddings of the
+    given documents are stored next to it so they are not recomputed later.
+    """
+    from safetensors.numpy import save_file
+
+    path = os.path.join(model_dir, name)
+    topic_model.save(
+        path,
+        serialization="safetensors",
+        save_ctfidf=True,
+        save_embedding_model=config["embedding_model"],
+    )
+
+    with open(os.path.join(path, "preprocessing.json"), "w", encoding="utf-8") as file:
+        json.dump(config, file, ensure_ascii=False, indent=2)
+
+    cached = cached_embeddings(
+        config["embedding_model"], dict.fromkeys(_text_digest(d) for d in documents or [])
+    )
+    if cached:
+        save_file(
+            {
+                "digests": np.frombuffer(b"".join(cached), dtype=np.uint8).reshape(-1, 16),
+                "embeddings": np.vstack(list(cached.values())),
+            },
+            os.path.join(path, "embeddings.safetensors"),
+        )
+    return path
+
+
+def list_saved_topic_models(model_dir=MODEL_DIR):
+    """Return the names of all saved topic models"""
+    if not os.path.isdir(model_dir):
+        return []
+    return sorted(
+        name
+        for name in os.listdir(model_dir)
+        if os.path.exists(os.path.join(model_dir, name, "preprocessing.json"))
+    )
+
+
+def load_topic_model(name, model_dir=MODEL_DIR):
+    """Load a saved model, its preprocessing config and its cached embeddings"""
+    from bertopic import BERTopic
+    from safetensors.numpy import load_file
+
+    path = os.path.join(model_dir, name)
+    with open(os.path.join(path, "preprocessing.json"), "r", encoding="utf-8") as file:
+        config = json.load(file)
+
+    topic_model = BERTopic.load(
+        path, embedding_model=load_embedding_model(config["embedding_model"])
+    )
+
+    embeddings_path = os.path.join(path, "embeddings.safetensors")
+    if os.path.exists(embeddings_path):
+        tensors = load_file(embeddings_path)
+        store_embeddings(
+            config["embedding_model"],
+            {digest.tobytes(): vector for digest, vector in zip(tensors["digests"], tensors["embeddings"])},
+        )
+
+    return topic_model, config
+
+
+def assign_topics(topic_model, config, df, selected_column):
+    """Assign topics to new responses with a saved model, without refitting"""
+    df_filtered = filter_entries(df, selected_column)
+    df_filtered = filter_text(df_filtered, selected_column, set(config["stopwords"]))
+
+    documents = TextColumn.from_frame(df_filtered, selected_column).to_list("embedding")
+    embeddings = embed_documents(config["embedding_model"], documents)
+    topics, _ = topic_model.transform(documents, embeddings)
+
+    return df_filtered.with_columns(pl.Series("Topic", topics))
+
+
 def generate_topic_summary(topic_model):
     """Generate and print topic summary"""
     topic_info = topic_model.get_topic_info()
@@ -169,23 +678,34 @@ def generate_topic_summary(topic_model):
     valid_topics = topic_info[topic_info["Topic"] != -1]
     st.write(f"Number of valid topics: {len(valid_topics)}")
 
+    memory = ctfidf_memory(topic_model)
+    st.write(
+        f"Topic vocabulary: {memory['vocabulary']} words, c-TF-IDF matrix "
+        f"{memory['nonzero']} non-zero values ({memory['megabytes']:.2f} MB)."
+    )
+
     return topic_info
 
 
-def perform_topic_modeling(df, selected_column, num_topics):
+def perform_topic_modeling(
+    df, selected_column, num_topics, backend="auto", vectorizer_config=None, mode="reproducible"
+):
     progress_bar = st.progress(0)
     status_text = st.empty()
+    start = time.perf_counter()
 
     status_text.text("Preprocessing data...")
     df_filtered = filter_entries(df, selected_column)
-    dominant_lang = detect_language(df_filtered, selected_column)
+    dominant_lang = detect_language(df_filtered, selected_column, mode)
     final_stopwords = set_stopwords(dominant_lang, [])
-    df_filtered = filter_text(df_filtered, selected_column, final_stopwords)
+    df_filtered = filter_text(df_filtered, selected_column, final_stopwords, ORIGINAL_TEXT_COLUMN)
+    responses = df_filtered[ORIGINAL_TEXT_COLUMN].to_list()
+    df_filtered = df_filtered.drop(ORIGINAL_TEXT_COLUMN)
     progress_bar.progress(0.3)
 
     status_text.text("Fitting topic model...")
     topic_model, topics, probabilities = fit_topic_model(
-        df_filtered, selected_column, 3, num_topics)
+        df_filtered, selected_column, 3, num_topics, backend, vectorizer_config, mode, dominant_lang)
     progress_bar.progress(0.7)
 
     status_text.text("Generating topic summary...")
@@ -195,54 +715,121 @@ def perform_topic_modeling(df, selected_column, num_topics):
     progress_bar.empty()
     status_text.empty()
 
-    return df_filtered, topic_info, topics, topic_model
+    config = {
+        "embedding_model": embedding_model_name(dominant_lang),
+        "language": dominant_lang,
+        "stopwords": sorted(final_stopwords),
+        "num_topics": num_topics,
+        "vectorizer": {**VECTORIZER_DEFAULTS, **(vectorizer_config or {})},
+        "mode": mode,
+        "runtime_seconds": round(time.perf_counter() - start, 2),
+    }
+
+    return df_filtered, responses, topic_info, topics, topic_model, config
+
+def model_fingerprint(topic_model):
+    """Identify a fitted model by its topic sizes and topic words"""
+    payload = json.dumps(
+        {
+            "sizes": topic_model.topic_sizes_,
+            "words": {
+                topic: [word for word, _ in words]
+                for topic, words in topic_model.get_topics().items()
+            },
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def cached_figure(topic_model, chart, build):
+    """Build a chart once per model fingerprint and reuse it on reruns"""
+    key = (model_fingerprint(topic_model), chart)
+    if key not in FIGURE_CACHE:
+        if len(FIGURE_CACHE) >= FIGURE_CACHE_SIZE:
+            FIGURE_CACHE.pop(next(iter(FIGURE_CACHE)))
+        FIGURE_CACHE[key] = build()
+    return FIGURE_CACHE[key]
+
+
+def largest_topics(topic_model, n_topics=MAX_TOPICS_IN_CHARTS):
+    """The ids of the n largest topics, excluding outliers"""
+    topic_info = topic_model.get_topic_info()
+    return topic_info[topic_info["Topic"] != -1].head(n_topics)["Topic"].tolist()
+
+
+def build_top_topics_chart(topic_model):
+    import plotly.graph_objects as go
+
+    topic_info = topic_model.get_topic_info()
+    top_topics = topic_info[topic_info["Topic"] != -1].head(10)
+    fig_bar = go.Figure(
+        data=[
+            go.Bar(
+                x=top_topics["Topic"],
+                y=top_topics["Count"],
+                text=top_topics["Name"],
+                textposition="auto",
+            )
+        ]
+    )
+    fig_bar.update_layout(
+        title="Top 10 Topics",
+        xaxis_title="Topic ID",
+        yaxis_title="Number of Documents",
+        height=500,
+    )
+    return fig_bar
+
 
 def visualize_topics(topic_model, topics):
-    """Generate various topic visualizations"""
+    """Generate various topic visualizations
+
+    Charts are only built when switched on and are cached per model. All of
+    them are computed from per-topic aggregates, never from the documents,
+    and are capped at the largest topics.
+    """
     try:
         # Top Topics Bar Chart
-        st.info(
-            "This chart shows the top topics based on the number of documents. Each bar’s height tells you how many documents belong to that topic,and the labels show the topic names."
-        )
-        topic_info = topic_model.get_topic_info()
-        top_topics = topic_info[topic_info["Topic"] != -1].head(10)
-        fig_bar = go.Figure(
-            data=[
-                go.Bar(
-                    x=top_topics["Topic"],
-                    y=top_topics["Count"],
-                    text=top_topics["Name"],
-                    textposition="auto",
-                )
-            ]
-        )
-        fig_bar.update_layout(
-            title="Top 10 Topics",
-            xaxis_title="Topic ID",
-            yaxis_title="Number of Documents",
-            height=500,
-        )
-        st.plotly_chart(fig_bar, use_container_width=True)
+        if st.toggle("Show top topics", value=True, key="show_top_topics"):
+            st.info(
+                "This chart shows the top topics based on the number of documents. Each bar’s height tells you how many documents belong to that topic,and the labels show the topic names."
+            )
+            fig_bar = cached_figure(
+                topic_model, "top_topics", lambda: build_top_topics_chart(topic_model)
+            )
+            st.plotly_chart(fig_bar, use_container_width=True)
 
         # Top Words per Topic Bar Chart
-        st.info(
-            "This chart shows the most important words for each topic. The length of each bar indicates how significant that word is in defining the topic, helping you understand what each topic is about."
-        )
-        fig_barchart = topic_model.visualize_barchart(
-            top_n_topics=20,  # number of topics to show
-            n_words=10,       # top words for each topic
-            width=800,
-            height=600
-        )
-        st.plotly_chart(fig_barchart, use_container_width=True)
+        if st.toggle("Show top words per topic", key="show_top_words"):
+            st.info(
+                "This chart shows the most important words for each topic. The length of each bar indicates how significant that word is in defining the topic, helping you understand what each topic is about."
+            )
+            fig_barchart = cached_figure(
+                topic_model,
+                "barchart",
+                lambda: topic_model.visualize_barchart(
+                    top_n_topics=20,  # number of topics to show
+                    n_words=10,       # top words for each topic
+                    width=800,
+                    height=600
+                ),
+            )
+            st.plotly_chart(fig_barchart, use_container_width=True)
 
         # Topic Relationship Graph (Intertopic Distance)
-        st.info(
-            "This graph displays how the topics are related to each other. Topics that appear closer together are more similar. The size of each circle indicates how many documents are in that topic. Hover over a circle to see more details."
-        )
-        fig_distance = topic_model.visualize_topics()
-        st.plotly_chart(fig_distance, use_container_width=True)
+        if st.toggle("Show topic relationships", key="show_topic_distance"):
+            st.info(
+                "This graph displays how the topics are related to each other. Topics that appear closer together are more similar. The size of each circle indicates how many documents are in that topic. Hover over a circle to see more details."
+            )
+            fig_distance = cached_figure(
+                topic_model,
+                "distance",
+                lambda: topic_model.visualize_topics(topics=largest_topics(topic_model)),
+            )
+            st.plotly_chart(fig_distance, use_container_width=True)
 
     except Exception as e:
         st.error(f"Error generating visualizations: {str(e)}")
-        st.write("Some visualizations may not be available due to insufficient data or model configuration.")
\ No newline at end of file
+        st.write("Some visualizations may not be available due to insufficient data or model configuration.")
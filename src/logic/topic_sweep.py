@@ -0,0 +1,97 @@
+import numpy as np
+import polars as pl
+from concurrent.futures import ThreadPoolExecutor
+from logic.topic_modeling import embed_deduplicated
+from logic.concurrency import thread_budget
+
+# ---------------------------------------
+# TOPIC COUNT SWEEP
+# ---------------------------------------
+
+
+def class_tfidf(labels, doc_term, n_clusters):
+    """BERTopic-style c-TF-IDF: term frequency per cluster, weighted by log(1 + A / f_t)"""
+    from scipy import sparse
+
+    membership = sparse.csr_matrix(
+        (np.ones(len(labels)), (labels, np.arange(len(labels)))),
+        shape=(n_clusters, len(labels)),
+    )
+    term_frequency = (membership @ doc_term).toarray()
+    term_frequency /= np.maximum(term_frequency.sum(axis=1, keepdims=True), 1)
+
+    frequency = np.asarray(doc_term.sum(axis=0)).ravel()
+    average_words = doc_term.sum() / n_clusters
+    return term_frequency * np.log(1 + average_words / np.maximum(frequency, 1))
+
+
+def topic_diversity(top_words):
+    """Share of unique words among the top words of all topics"""
+    all_words = np.concatenate(top_words)
+    return len(np.unique(all_words)) / max(len(all_words), 1)
+
+
+def topic_coherence(top_words, presence):
+    """Mean NPMI of word pairs within each topic, from document co-occurrence"""
+    n_documents = presence.shape[0]
+    scores = []
+    for words in top_words:
+        columns = presence[:, words]
+        co_occurrence = (columns.T @ columns).toarray() / n_documents
+        probability = np.diag(co_occurrence)
+        upper = np.triu_indices(len(words), k=1)
+        joint = co_occurrence[upper]
+        expected = probability[upper[0]] * probability[upper[1]]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            npmi = np.log(joint / expected) / -np.log(joint)
+        npmi[joint == 0] = -1.0
+        npmi[joint == 1] = 1.0
+        scores.append(np.nanmean(npmi))
+    return float(np.mean(scores))
+
+
+def evaluate_topic_count(reduced, doc_term, presence, n_topics, top_n_words=10):
+    """Cluster the reduced embeddings into n_topics and score the result"""
+    from sklearn.cluster import KMeans
+
+    labels = KMeans(n_clusters=n_topics, n_init=3, random_state=42).fit_predict(reduced)
+    scores = class_tfidf(labels, doc_term, n_topics)
+    top_words = [np.argsort(row)[::-1][:top_n_words] for row in scores]
+    return {
+        "Topics": n_topics,
+        "Diversity": topic_diversity(top_words),
+        "Coherence": topic_coherence(top_words, presence),
+    }
+
+
+@thread_budget("topic_modeling")
+def sweep_topic_counts(documents, model_name, candidate_counts, final_stopwords=None, max_workers=4):
+    """Score several topic counts in about the time of a single fit
+
+    Embeddings, the UMAP projection and the document-term matrix are computed
+    once and shared; only the clustering and scoring run per candidate, in
+    parallel.
+    """
+    from sklearn.feature_extraction.text import CountVectorizer
+    from umap import UMAP
+
+    embeddings = embed_deduplicated(model_name, documents)
+    reduced = UMAP(
+        n_neighbors=10, n_components=5, metric="cosine", random_state=42
+    ).fit_transform(embeddings)
+
+    vectorizer = CountVectorizer(
+        stop_words=sorted(final_stopwords) if final_stopwords else None
+    )
+    doc_term = vectorizer.fit_transform(documents).astype(np.float64)
+    presence = (doc_term > 0).astype(np.float64).tocsc()
+
+    candidates = [k for k in candidate_counts if 2 <= k < len(documents)]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        rows = list(
+            executor.map(
+                lambda k: evaluate_topic_count(reduced, doc_term, presence, k),
+                candidates,
+            )
+        )
+    return pl.DataFrame(rows)
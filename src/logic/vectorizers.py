@@ -0,0 +1,25 @@
+import numbers
+from sklearn.feature_extraction.text import CountVectorizer
+
+# ---------------------------------------
+# TOPIC VECTORIZER
+# ---------------------------------------
+
+
+class TopicCountVectorizer(CountVectorizer):
+    """CountVectorizer whose integer min_df never exceeds the number of documents
+
+    BERTopic fits the vectorizer on one document per topic, so min_df counts
+    topics. A run that finds fewer topics than min_df (or reduce_topics) would
+    otherwise fail with "max_df corresponds to < documents than min_df".
+    """
+
+    def fit_transform(self, raw_documents, y=None):
+        raw_documents = list(raw_documents)
+        requested = self.min_df
+        if isinstance(requested, numbers.Integral) and requested > len(raw_documents):
+            self.min_df = max(len(raw_documents), 1)
+        try:
+            return super().fit_transform(raw_documents, y)
+        finally:
+            self.min_df = requested
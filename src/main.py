@@ -1,3 +1,9 @@
+from logic.concurrency import configure_process_threads
+
+# Size the polars pool before polars is imported (streamlit itself does not import it);
+# torch, BLAS and numba are limited per analysis by thread_budget
+configure_process_threads()
+
 import streamlit as st
 from config.screen_scanner import get_screens, group_pages_by_subdirectory
 from logic.file_handler import file_handler
@@ -1,5 +1,6 @@
 import streamlit as st
 from logic.Word_Cloud import generate_wordcloud
+from logic.data_preview import data_preview
 
 # ---------------------------------------
 # PAGE CONFIGURATION
@@ -23,7 +24,7 @@ st.markdown(
 
 # Display or edit DataFrame if available
 if st.session_state.df is not None:
-    st.session_state.df = st.data_editor(st.session_state.df, key="main_data_editor")
+    data_preview("main_data_editor")
     generate_wordcloud()
 else:
     st.write("No DataFrame available. Please upload a file.")
@@ -1,5 +1,13 @@
 import streamlit as st
-from logic.sentiment_analysis import perform_sentiment_analysis, visualize_sentiment
+from logic.sentiment_analysis import (
+    perform_sentiment_analysis,
+    visualize_sentiment,
+    calibrate_ensemble,
+    save_calibration,
+    load_calibration,
+    escalation_rate,
+)
+from logic.data_preview import data_preview
 
 # ---------------------------------------
 # PAGE CONFIGURATION
@@ -22,7 +30,7 @@ st.markdown(
 
 # Display or edit DataFrame if available
 if st.session_state.df is not None:
-    st.session_state.df = st.data_editor(st.session_state.df, key="main_data_editor")
+    data_preview("main_data_editor")
 
     # Column selection for sentiment analysis
     columns = st.session_state.df.columns
@@ -30,22 +38,100 @@ if st.session_state.df is not None:
         "Select a column for Sentiment Analysis", columns, key="sentiment_column_select"
     )
 
+    # Tiered mode for large files: a fast model first, the transformer only when unsure
+    modes = {
+        "Transformer on every response": None,
+        "Tiered: VADER first": "vader",
+        "Tiered: hashed n-gram model first": "hashed",
+    }
+    mode = st.radio(
+        "Mode",
+        list(modes),
+        key="sentiment_mode",
+        help="For very large files the tiered modes are much faster: only responses the fast model is unsure about are sent to the transformer.",
+    )
+    confidence_threshold = st.slider(
+        "Confidence threshold",
+        min_value=0.0,
+        max_value=1.0,
+        value=0.5,
+        step=0.05,
+        disabled=modes[mode] is None,
+        help="Responses where the fast model's confidence is below this value are escalated to the transformer.",
+    )
+
+    near_duplicates = st.checkbox(
+        "Score near-duplicate responses once",
+        value=False,
+        help="Faster on repetitive answers, but near-duplicates can differ in a word that flips the sentiment (e.g. 'would' / 'would not recommend'). Exact duplicates are always scored once.",
+    )
+
     if st.button("Run Sentiment Analysis"):
         try:
             # Perform sentiment analysis
             st.session_state.df = perform_sentiment_analysis(
-                st.session_state.df, selected_column
+                st.session_state.df,
+                selected_column,
+                fast_model=modes[mode],
+                confidence_threshold=confidence_threshold,
+                near_duplicates=near_duplicates,
             )
+            if modes[mode] is not None:
+                st.metric(
+                    "Escalated to the transformer",
+                    f"{escalation_rate(st.session_state.df):.1%}",
+                )
 
             # Display results
             st.write("Sentiment Analysis Results:")
             st.dataframe(st.session_state.df)
 
             # Visualize results
-            # visualize_sentiment(st.session_state.df)
+            visualize_sentiment(st.session_state.df)
 
         except Exception as e:
             st.error(f"Error performing sentiment analysis: {e}")
+
+    # Calibration of the combined label on hand-labelled rows
+    with st.expander("Calibrate the combined sentiment"):
+        st.write(
+            "By default a response is only Positive when both models agree. "
+            "With a column of hand-labelled rows ('Positive' or 'Negative', other rows empty) "
+            "the weight of both models and the decision threshold can be learned instead."
+        )
+        calibration = load_calibration()
+        if calibration is not None:
+            st.caption(
+                f"Current calibration: weight {calibration['weight']:.2f}, "
+                f"threshold {calibration['threshold']:.2f}"
+            )
+
+        if "VADER_Score" not in st.session_state.df.columns:
+            st.info("Run the sentiment analysis first.")
+        else:
+            label_column = st.selectbox(
+                "Column with labels", columns, key="sentiment_label_column"
+            )
+            if st.button("Calibrate"):
+                try:
+                    calibration = calibrate_ensemble(st.session_state.df, label_column)
+                    if calibration["f1"] <= calibration["baseline_f1"]:
+                        st.warning(
+                            f"The best calibration reaches F1 {calibration['f1']:.3f}, which does not "
+                            f"beat {calibration['baseline_f1']:.3f} for both models agreeing on "
+                            f"{calibration['n_samples']} rows. It was not saved."
+                        )
+                    else:
+                        save_calibration(calibration)
+                        st.success(
+                            f"Weight {calibration['weight']:.2f} for the transformer, "
+                            f"threshold {calibration['threshold']:.2f}: F1 {calibration['f1']:.3f} "
+                            f"(both models agreeing: {calibration['baseline_f1']:.3f}) on "
+                            f"{calibration['n_samples']} rows. "
+                            "It is used from the next run on."
+                        )
+                except Exception as e:
+                    st.error(f"Error calibrating sentiment: {e}")
 else:
     st.write("No DataFrame available. Please upload a file.")
 
@@ -1,6 +1,22 @@
 import streamlit as st
 import polars as pl
-from logic.topic_modeling import perform_topic_modeling, visualize_topics
+from logic.topic_sweep import sweep_topic_counts
+from logic.document_map import project_documents, document_map_figure
+from logic.topic_modeling import (
+    perform_topic_modeling,
+    visualize_topics,
+    save_topic_model,
+    list_saved_topic_models,
+    load_topic_model,
+    assign_topics,
+    prepare_documents,
+    embedding_model_name,
+    create_online_topic_model,
+    partial_fit_topic_model,
+    schedule_full_refit,
+    RUN_MODES,
+)
+from logic.data_preview import data_preview
 
 # ---------------------------------------
 # PAGE CONFIGURATION
@@ -28,9 +44,7 @@ st.markdown(
 
 # Display or edit DataFrame if available
 if "df" in st.session_state and st.session_state.df is not None:
-    st.session_state.df = st.data_editor(
-        st.session_state.df, key="topic_modeling_data_editor"
-    )
+    data_preview("topic_modeling_data_editor")
 
     # Column selection for topic modeling
     columns = st.session_state.df.columns
@@ -41,6 +55,43 @@ if "df" in st.session_state and st.session_state.df is not None:
         help="Choose the column containing the text data for topic modeling. Ideally, this column holds the reviews, comments or descriptions that will be analyzed to discover potential topics.",
     )
  
+    # Compare topic counts before picking one
+    with st.expander("Find a good number of topics"):
+        st.write(
+            "Scores a range of topic counts on shared embeddings. Higher diversity means "
+            "topics use different words; higher coherence means a topic's words occur together."
+        )
+        sweep_range = st.slider(
+            "Topic counts to compare", min_value=2, max_value=40, value=(2, 20)
+        )
+        if st.button("Compare Topic Counts"):
+            try:
+                with st.spinner("Comparing topic counts..."):
+                    documents, _, dominant_lang, final_stopwords = prepare_documents(
+                        st.session_state.df, selected_column
+                    )
+                    sweep = sweep_topic_counts(
+                        documents,
+                        embedding_model_name(dominant_lang),
+                        range(sweep_range[0], sweep_range[1] + 1),
+                        final_stopwords,
+                    )
+                import plotly.graph_objects as go
+
+                fig_sweep = go.Figure(
+                    [
+                        go.Scatter(x=sweep["Topics"], y=sweep["Diversity"], name="Diversity"),
+                        go.Scatter(x=sweep["Topics"], y=sweep["Coherence"], name="Coherence"),
+                    ]
+                )
+                fig_sweep.update_layout(
+                    xaxis_title="Number of topics", yaxis_title="Score", height=400
+                )
+                st.plotly_chart(fig_sweep, use_container_width=True)
+                st.dataframe(sweep)
+            except Exception as e:
+                st.error(f"Error comparing topic counts: {e}")
+
     # Add a checkbox to choose auto-detection
     use_auto_topics = st.checkbox("Use auto-detect for number of topics", value=True)
 
@@ -55,12 +106,64 @@ if "df" in st.session_state and st.session_state.df is not None:
             step=1,
             help="Adjust topics granularity: fewer topics lead to broader, more general clusters, more topics mean finer and more specific clusters.")
     
+    backend = st.selectbox(
+        "Clustering backend",
+        ["auto", "umap_hdbscan", "scalable"],
+        help="'auto' switches to the faster PCA + MiniBatchKMeans backend for very large datasets (100k+ responses).",
+    )
+    run_mode = st.radio(
+        "Run mode",
+        RUN_MODES,
+        horizontal=True,
+        help="'reproducible' gives the same topics on every run (fixed seeds, single-threaded UMAP), for reports. 'fast' uses all allotted cores and reuses the neighbour graph between runs, for exploration; topics can differ slightly per run.",
+    )
+
+    with st.expander("Vocabulary settings"):
+        st.write(
+            "Limit the vocabulary used to describe topics. This keeps topic modeling fast "
+            "and memory-friendly on large datasets with many unique (compound) words."
+        )
+        max_features = st.number_input(
+            "Maximum vocabulary size", min_value=1_000, value=20_000, step=1_000
+        )
+        min_df = st.number_input(
+            "Minimum number of topics a word must appear in", min_value=1, value=1
+        )
+        use_hashing = st.checkbox(
+            "Select the vocabulary with bounded memory (hashing)",
+            help="Counts words in fixed-size hash buckets instead of a full vocabulary. Recommended for very large datasets.",
+        )
+        vectorizer_config = {
+            "max_features": int(max_features),
+            "min_df": int(min_df),
+            "use_hashing": use_hashing,
+        }
+
     if st.button("Run Topic Modeling"):
         try:
             # perform topic modeling and get the filtered df
-            filtered_df, topics, topic_assignments, topic_model = perform_topic_modeling(
-                st.session_state.df, selected_column, num_topics
+            (
+                filtered_df,
+                responses,
+                topics,
+                topic_assignments,
+                topic_model,
+                config,
+            ) = perform_topic_modeling(
+                st.session_state.df,
+                selected_column,
+                num_topics,
+                backend,
+                vectorizer_config,
+                run_mode,
             )
+            st.session_state.topic_model = topic_model
+            st.session_state.topic_model_config = config
+            st.session_state.topic_model_documents = filtered_df[selected_column].to_list()
+            st.session_state.topic_model_responses = responses
+            st.session_state.topic_info = topics
+            st.session_state.topic_assignments = topic_assignments
+            st.session_state.document_map_level = 1
 
             # update the session state df to the filtered one
             st.session_state.df = filtered_df.with_columns(
@@ -68,15 +171,148 @@ if "df" in st.session_state and st.session_state.df is not None:
             )
 
             # Display results
+            st.caption(f"Fitted in {config['runtime_seconds']:.1f} s ({run_mode} mode)")
             st.write("Topic Modeling Results:")
             st.dataframe(st.session_state.df)
 
-            # Visualize topics
-            visualize_topics(topic_model, topics)
-
         except Exception as e:
             st.error(f"Error performing topic modeling: {e}")
 
+    # Visualize topics (each chart is built only when it is switched on)
+    if st.session_state.get("topic_model") is not None:
+        visualize_topics(st.session_state.topic_model, st.session_state.get("topic_info"))
+
+        # Document map: a density layer of all documents plus a sample of points
+        if st.toggle("Show document map", key="show_document_map"):
+            try:
+                with st.spinner("Projecting documents..."):
+                    coords = project_documents(
+                        st.session_state.topic_model_config["embedding_model"],
+                        st.session_state.topic_model_documents,
+                    )
+                fig_map, shown = document_map_figure(
+                    coords,
+                    st.session_state.topic_assignments,
+                    st.session_state.topic_model_documents,
+                    st.session_state.get("document_map_level", 1),
+                )
+                st.plotly_chart(fig_map, use_container_width=True)
+                if shown < len(coords) and st.button("Load more points"):
+                    st.session_state.document_map_level = (
+                        st.session_state.get("document_map_level", 1) + 1
+                    )
+                    st.rerun()
+            except Exception as e:
+                st.error(f"Error generating document map: {e}")
+
+    # Save the fitted model so new survey waves can reuse it
+    if st.session_state.get("topic_model") is not None:
+        with st.expander("Save topic model"):
+            model_name = st.text_input("Model name", value="topic_model")
+            if st.button("Save Model"):
+                try:
+                    path = save_topic_model(
+                        st.session_state.topic_model,
+                        st.session_state.topic_model_config,
+                        model_name,
+                        documents=st.session_state.topic_model_documents,
+                    )
+                    st.success(f"Model saved to {path}")
+                except Exception as e:
+                    st.error(f"Error saving topic model: {e}")
+
+    # Assign topics to new responses with a previously saved model
+    saved_models = list_saved_topic_models()
+    if saved_models:
+        with st.expander("Assign topics with a saved model"):
+            saved_model = st.selectbox("Saved model", saved_models)
+            if st.button("Assign Topics"):
+                try:
+                    topic_model, config = load_topic_model(saved_model)
+                    st.session_state.df = assign_topics(
+                        topic_model, config, st.session_state.df, selected_column
+                    )
+                    st.write("Topic Assignment Results:")
+                    st.dataframe(st.session_state.df)
+                except Exception as e:
+                    st.error(f"Error assigning topics: {e}")
+
+    # Update a topic model batch by batch as new responses arrive
+    with st.expander("Incremental topic modeling"):
+        st.write(
+            "Add the selected column as a new batch to a model that is updated "
+            "incrementally, instead of refitting on all responses collected so far."
+        )
+        online_topics = st.number_input(
+            "Number of topics", min_value=2, max_value=50, value=10, key="online_topics"
+        )
+        refit_every = st.number_input(
+            "Refit the full model in the background every N batches (0 = never)",
+            min_value=0,
+            value=0,
+        )
+
+        if st.button("Add Batch"):
+            try:
+                documents, responses, dominant_lang, final_stopwords = prepare_documents(
+                    st.session_state.df, selected_column
+                )
+                if st.session_state.get("online_topic_model") is None:
+                    model_name = embedding_model_name(dominant_lang)
+                    st.session_state.online_topic_model = create_online_topic_model(
+                        model_name, int(online_topics), final_stopwords
+                    )
+                    st.session_state.online_documents = []
+                    st.session_state.online_responses = []
+                    st.session_state.online_batches = 0
+                    st.session_state.online_config = {
+                        "embedding_model": model_name,
+                        "language": dominant_lang,
+                        "stopwords": sorted(final_stopwords),
+                        "num_topics": "auto",
+                    }
+                # Later batches must use the model the topic space was built with
+                model_name = st.session_state.online_config["embedding_model"]
+
+                _, batch_topics = partial_fit_topic_model(
+                    st.session_state.online_topic_model, model_name, documents
+                )
+                st.session_state.online_documents.extend(documents)
+                st.session_state.online_responses.extend(responses)
+                st.session_state.online_batches += 1
+                st.success(
+                    f"Model updated with {len(documents)} responses "
+                    f"({st.session_state.online_batches} batches so far)."
+                )
+                st.dataframe(st.session_state.online_topic_model.get_topic_info())
+
+                if refit_every and st.session_state.online_batches % refit_every == 0:
+                    st.session_state.full_refit_documents = list(st.session_state.online_documents)
+                    st.session_state.full_refit_responses = list(st.session_state.online_responses)
+                    st.session_state.full_refit = schedule_full_refit(
+                        st.session_state.full_refit_documents, model_name, 3, "auto"
+                    )
+                    st.info("Full refit started in the background.")
+            except Exception as e:
+                st.error(f"Error updating topic model: {e}")
+
+        refit = st.session_state.get("full_refit")
+        if refit is not None and refit.done():
+            try:
+                topic_model, topic_assignments, _ = refit.result()
+                # Replace the model and everything derived from it together
+                st.session_state.topic_model = topic_model
+                st.session_state.topic_model_config = st.session_state.online_config
+                st.session_state.topic_model_documents = st.session_state.full_refit_documents
+                st.session_state.topic_model_responses = st.session_state.full_refit_responses
+                st.session_state.topic_info = topic_model.get_topic_info()
+                st.session_state.topic_assignments = topic_assignments
+                st.session_state.document_map_level = 1
+                st.success("Background refit finished; the refitted model can be saved above.")
+            except Exception as e:
+                st.error(f"Background refit failed: {e}")
+            st.session_state.full_refit = None
+
 else:
     st.write("No DataFrame available. Please upload a file on the Home page.")
 
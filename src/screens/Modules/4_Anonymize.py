@@ -1,7 +1,9 @@
 import streamlit as st
 import pandas as pd
 import polars as pl
-from logic.anonymizer import process_dataframe
+from logic.anonymizer import process_dataframe, stream_anonymize_file
+from logic.session_store import get_data_store
+from logic.data_preview import data_preview
 
 # ---------------------------------------
 # PAGE CONFIGURATION
@@ -23,8 +25,8 @@ st.markdown(
 
 # Display interface only if DataFrame exists
 if "df" in st.session_state and st.session_state.df is not None:
-    # Data editor
-    st.session_state.df = st.data_editor(st.session_state.df, key="anonym_editor")
+    # Data preview
+    data_preview("anonym_editor")
 
     # Column selection
     text_col = st.selectbox(
@@ -36,10 +38,15 @@ if "df" in st.session_state and st.session_state.df is not None:
         with st.spinner("Detecting sensitive information..."):
             # Process dataframe
             results = process_dataframe(st.session_state.df, text_col)
-            st.session_state.anonymized_df = results
+            get_data_store().put("anonymized_df", results)
 
         st.success("Anonymization complete!")
 
+    # Results live in the session store, so they survive the reruns that the
+    # widgets below trigger
+    if "anonymized_df" in get_data_store():
+        results = get_data_store().get("anonymized_df")
+
         # Display debugging information
         st.subheader("Anonymization Preview")
         show_debug = st.toggle("Show replacements", value=True)
@@ -105,3 +112,34 @@ if "df" in st.session_state and st.session_state.df is not None:
 
 else:
     st.warning("No data loaded. Upload a file first from the main page.")
+
+# ---------------------------------------
+# LARGE FILES
+# ---------------------------------------
+with st.expander("Anonymize a large file from disk"):
+    st.write(
+        "Large files are read and anonymized in batches and written to "
+        "`data/output` part by part. An interrupted run continues where it stopped."
+    )
+    input_path = st.text_input("Path to a CSV, Parquet or Excel file", "data/input/")
+    stream_col = st.text_input("Text column to anonymize", key="stream_text_col")
+    output_format = st.radio("Output format", ["parquet", "csv"], horizontal=True)
+    batch_size = st.number_input(
+        "Rows per batch", min_value=100, value=10_000, step=1_000
+    )
+
+    if st.button("Anonymize File"):
+        status_text = st.empty()
+        try:
+            output_path = stream_anonymize_file(
+                input_path,
+                stream_col,
+                output_format=output_format,
+                batch_size=int(batch_size),
+                progress_callback=lambda rows: status_text.text(
+                    f"Processed {rows} rows"
+                ),
+            )
+            st.success(f"Anonymized data written to {output_path}")
+        except Exception as e:
+            st.error(f"Error anonymizing file: {e}")
@@ -0,0 +1,73 @@
+import streamlit as st
+from logic.similarity_search import (
+    build_similarity_index,
+    list_similarity_indexes,
+    load_similarity_index,
+    find_similar,
+)
+
+# ---------------------------------------
+# PAGE CONFIGURATION
+# ---------------------------------------
+icon = ":material/manage_search:"
+
+# ---------------------------------------
+# PAGE ELEMENTS
+# ---------------------------------------
+st.title("Similarity Search")
+
+st.markdown(
+    """
+    ### When do I use similarity search?
+    Similarity search finds the responses that are closest in meaning to a text you type,
+    or to a response you select. Use it to explore near-duplicates and related answers.
+
+    It reuses the embeddings computed during topic modeling, so run topic modeling first
+    (or load an index that was saved earlier).
+    """
+)
+
+# Build a new index from the last topic modeling run
+if st.session_state.get("topic_model_documents"):
+    with st.expander("Build index from the last topic modeling run", expanded=True):
+        index_name = st.text_input("Index name", value="responses")
+        if st.button("Build Index"):
+            try:
+                with st.spinner("Building index..."):
+                    build_similarity_index(
+                        st.session_state.topic_model_documents,
+                        st.session_state.topic_model_config,
+                        index_name,
+                        responses=st.session_state.get("topic_model_responses"),
+                    )
+                st.session_state.similarity_index_name = None
+                st.success(f"Index '{index_name}' built and saved.")
+            except Exception as e:
+                st.error(f"Error building index: {e}")
+
+saved_indexes = list_similarity_indexes()
+if saved_indexes:
+    selected_index = st.selectbox("Index", saved_indexes)
+    if st.session_state.get("similarity_index_name") != selected_index:
+        st.session_state.similarity_index = load_similarity_index(selected_index)
+        st.session_state.similarity_index_name = selected_index
+    index, documents, config = st.session_state.similarity_index
+
+    search_by = st.radio("Search by", ["Text", "Response"], horizontal=True)
+    k = st.slider("Number of results", min_value=1, max_value=50, value=10)
+
+    try:
+        if search_by == "Text":
+            query = st.text_input("Query text")
+            if query:
+                st.dataframe(find_similar(index, documents, config, query=query, k=k))
+        else:
+            row_id = st.number_input(
+                "Row", min_value=0, max_value=len(documents) - 1, value=0
+            )
+            st.write(f"**Selected response:** {documents[int(row_id)]}")
+            st.dataframe(find_similar(index, documents, config, row_id=int(row_id), k=k))
+    except Exception as e:
+        st.error(f"Error searching index: {e}")
+elif not st.session_state.get("topic_model_documents"):
+    st.write("No index available. Run topic modeling first to compute embeddings.")
@@ -0,0 +1,77 @@
+import streamlit as st
+from logic.batch_analysis import ANALYSES, run_batch
+from logic.session_store import get_data_store
+
+# ---------------------------------------
+# PAGE CONFIGURATION
+# ---------------------------------------
+icon = ":material/table_view:"
+
+# ---------------------------------------
+# PAGE ELEMENTS
+# ---------------------------------------
+st.title("Batch Analysis")
+
+st.markdown(
+    """
+    ### When do I use batch analysis?
+    Use batch analysis when a questionnaire has many open questions, possibly spread over several sheets.
+    Select all sheets and columns at once: the models are loaded only once and the columns are processed in parallel.
+    All results are combined into one table that you can download.
+    """
+)
+
+if st.session_state.get("sheets"):
+    sheets = st.session_state.sheets
+
+    selected_sheets = st.multiselect(
+        "Sheets", list(sheets.keys()), default=list(sheets.keys())[:1]
+    )
+    selection = {}
+    for sheet in selected_sheets:
+        selection[sheet] = st.multiselect(
+            f"Columns in '{sheet}'", sheets[sheet].columns, key=f"batch_columns_{sheet}"
+        )
+
+    analyses = st.multiselect("Analyses", ANALYSES, default=["Sentiment"])
+    max_workers = st.slider(
+        "Parallel workers",
+        min_value=1,
+        max_value=8,
+        value=2,
+        help="More workers finish sooner but need more memory and CPU.",
+    )
+
+    if st.button("Run Batch Analysis"):
+        progress_bar = st.progress(0)
+        status_text = st.empty()
+
+        def update_progress(done, total):
+            progress_bar.progress(done / total)
+            status_text.text(f"Finished {done}/{total} analyses")
+
+        with st.spinner("Running batch analysis..."):
+            results, errors = run_batch(
+                sheets, selection, analyses, max_workers, update_progress
+            )
+        progress_bar.empty()
+        status_text.empty()
+
+        for sheet, column, analysis, error in errors:
+            st.error(f"{analysis} on '{sheet}' / '{column}' failed: {error}")
+
+        if not results.is_empty():
+            get_data_store().put("batch_results", results)
+            st.success(f"Batch analysis complete: {len(results)} result rows.")
+
+    if "batch_results" in get_data_store():
+        batch_results = get_data_store().get("batch_results")
+        st.dataframe(batch_results)
+        st.download_button(
+            label="Download Batch Results",
+            data=batch_results.write_csv().encode("utf-8"),
+            file_name="batch_results.csv",
+            mime="text/csv",
+        )
+else:
+    st.write("No DataFrame available. Please upload a file.")
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The app runs with src on the path (streamlit run src/main.py); tests do the same
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
@@ -0,0 +1,195 @@
+import json
+import os
+
+import polars as pl
+import pytest
+
+pytest.importorskip("streamlit")
+
+from logic import anonymizer
+from logic.anonymizer import (
+    anonymize_text,
+    build_name_index,
+    detect_names,
+    iter_record_batches,
+    merge_spans,
+    stream_anonymize_file,
+)
+
+
+@pytest.fixture(autouse=True)
+def name_index(monkeypatch):
+    index = build_name_index(["Jan", "Anna", "Pieter", "Jan Willem"])
+    monkeypatch.setattr(anonymizer, "load_name_index", lambda: index)
+    monkeypatch.setattr(anonymizer, "load_illnesses", lambda: frozenset({"griep"}))
+    return index
+
+
+def names(text):
+    return [text[start:end] for label, start, end in detect_names(text)]
+
+
+def test_single_first_name():
+    assert names("Gisteren belde Anna nog.") == ["Anna"]
+
+
+def test_first_name_with_capitalized_surname():
+    assert names("Anna Jansen was ziek.") == ["Anna Jansen"]
+
+
+def test_tussenvoegsel_chain_before_surname():
+    assert names("Ik sprak Jan van der Berg en Anna de Vries.") == ["Jan van der Berg", "Anna de Vries"]
+
+
+def test_tussenvoegsel_without_surname_is_not_part_of_the_name():
+    assert names("Dit is Jan van de zaak.") == ["Jan"]
+
+
+def test_longest_multi_token_name_from_the_index():
+    assert names("Jan Willem Bakker kwam langs.") == ["Jan Willem Bakker"]
+
+
+def test_punctuation_separates_names():
+    assert names("Jan, Pieter en Anna.") == ["Jan", "Pieter", "Anna"]
+    # "Jan Willem" is only matched when the tokens are separated by whitespace
+    assert names("Jan. Willem kwam later.") == ["Jan"]
+
+
+def test_lowercase_and_unknown_words_are_not_names():
+    assert names("jan en anna kwamen met Kees.") == []
+
+
+def test_spans_are_labelled_offsets():
+    assert detect_names("Hoi Anna") == [("NAME", 4, 8)]
+
+
+def test_merge_spans_sorts_and_keeps_disjoint_spans():
+    spans = [("DISEASE", 20, 25), ("NAME", 0, 4)]
+
+    assert merge_spans(spans) == [("NAME", 0, 4), ("DISEASE", 20, 25)]
+
+
+def test_overlapping_spans_keep_the_label_of_the_longest():
+    # "Anna Griep" as a name overlaps the illness "griep"
+    spans = [("DISEASE", 5, 10), ("NAME", 0, 10)]
+    assert merge_spans(spans) == [("NAME", 0, 10)]
+
+    spans = [("NAME", 0, 7), ("DISEASE", 5, 20)]
+    assert merge_spans(spans) == [("DISEASE", 0, 20)]
+
+
+def test_adjacent_spans_are_not_merged():
+    assert merge_spans([("NAME", 0, 4), ("DISEASE", 4, 9)]) == [("NAME", 0, 4), ("DISEASE", 4, 9)]
+
+
+def test_anonymize_text_replaces_merged_spans():
+    text = "Anna Griep heeft griep"
+    spans = [("DISEASE", 17, 22), ("DISEASE", 5, 10), ("NAME", 0, 10)]
+
+    assert anonymize_text(text, spans) == "[NAME] heeft [DISEASE]"
+
+
+def test_offsets_only_returns_the_merged_spans():
+    text = "Anna Griep heeft griep"
+    spans = [("DISEASE", 17, 22), ("DISEASE", 5, 10), ("NAME", 0, 10)]
+
+    assert anonymize_text(text, spans, offsets_only=True) == [("NAME", 0, 10), ("DISEASE", 17, 22)]
+
+
+# ---------------------------------------
+# Streaming with checkpoints
+# ---------------------------------------
+
+TEXTS = ["Anna heeft griep", "Jan de Vries belde", None, "Pieter is beter", "Anna heeft griep"]
+
+
+class Killed(Exception):
+    pass
+
+
+@pytest.fixture
+def input_path(tmp_path):
+    path = tmp_path / "responses.parquet"
+    pl.DataFrame({"id": list(range(len(TEXTS))), "text": TEXTS}).write_parquet(path)
+    return str(path)
+
+
+@pytest.fixture
+def anonymized_rows(monkeypatch):
+    """Count the rows that are actually anonymized"""
+    rows = []
+    anonymize_batch = anonymizer.anonymize_batch
+
+    def counting(batch, text_column):
+        rows.extend(batch["id"].to_list())
+        return anonymize_batch(batch, text_column)
+
+    monkeypatch.setattr(anonymizer, "anonymize_batch", counting)
+    return rows
+
+
+def kill_after(parts):
+    def progress(rows_done):
+        if rows_done >= parts * 2:
+            raise Killed
+
+    return progress
+
+
+def read_checkpoint(target_dir):
+    with open(os.path.join(target_dir, "checkpoint.json"), encoding="utf-8") as file:
+        return json.load(file)
+
+
+def test_killed_run_resumes_after_the_last_part(input_path, tmp_path, anonymized_rows):
+    output_dir = str(tmp_path / "out")
+    with pytest.raises(Killed):
+        stream_anonymize_file(input_path, "text", batch_size=2, output_dir=output_dir, progress_callback=kill_after(1))
+    assert anonymized_rows == [0, 1]
+
+    target_dir = stream_anonymize_file(input_path, "text", batch_size=2, output_dir=output_dir)
+
+    assert anonymized_rows == [0, 1, 2, 3, 4]
+    assert sorted(name for name in os.listdir(target_dir) if name.startswith("part-")) == [
+        "part-00000.parquet",
+        "part-00001.parquet",
+        "part-00002.parquet",
+    ]
+    result = pl.read_parquet(os.path.join(target_dir, "part-*.parquet"))
+    assert result["id"].to_list() == [0, 1, 2, 3, 4]
+    assert result["anonymized"].to_list() == [
+        "[NAME] heeft [DISEASE]",
+        "[NAME] belde",
+        None,
+        "[NAME] is beter",
+        "[NAME] heeft [DISEASE]",
+    ]
+    checkpoint = read_checkpoint(target_dir)
+    assert checkpoint["rows_done"] == 5 and checkpoint["complete"]
+
+
+def test_changed_options_restart_the_run(input_path, tmp_path, anonymized_rows):
+    output_dir = str(tmp_path / "out")
+    with pytest.raises(Killed):
+        stream_anonymize_file(input_path, "text", batch_size=2, output_dir=output_dir, progress_callback=kill_after(2))
+
+    target_dir = stream_anonymize_file(input_path, "text", batch_size=3, output_dir=output_dir)
+
+    assert anonymized_rows == [0, 1, 2, 3, 0, 1, 2, 3, 4]
+    assert sorted(name for name in os.listdir(target_dir) if name.startswith("part-")) == [
+        "part-00000.parquet",
+        "part-00001.parquet",
+    ]
+    assert pl.read_parquet(os.path.join(target_dir, "part-*.parquet"))["id"].to_list() == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.skipif(not hasattr(pl, "read_csv_batched"), reason="needs polars' batched CSV reader")
+def test_numeric_looking_text_column_is_read_as_strings(tmp_path):
+    path = tmp_path / "responses.csv"
+    pl.DataFrame({"id": [1, 2, 3, 4], "text": ["1", "2", "Jan heeft griep", "3"]}).write_csv(path)
+
+    batches = list(iter_record_batches(str(path), 2, "text"))
+
+    assert all(batch["text"].dtype == pl.String for batch in batches)
+    assert all(batch["id"].dtype == pl.Int64 for batch in batches)
+    assert pl.concat(batches)["text"].to_list() == ["1", "2", "Jan heeft griep", "3"]
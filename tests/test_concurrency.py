@@ -0,0 +1,201 @@
+import sys
+import types
+import warnings
+import threading
+
+import numpy as np
+import pytest
+
+from logic import concurrency
+from logic.concurrency import thread_budget, active_runs, shared_threads, load_once
+
+
+class FakeThreadPools:
+    """Stand-ins for torch and threadpoolctl that record the limits they get"""
+
+    def __init__(self):
+        self.torch_threads = None
+        self.blas_limits = []
+        self.torch = types.SimpleNamespace(
+            set_num_threads=self.set_torch, get_num_threads=lambda: self.torch_threads
+        )
+        self.threadpoolctl = types.SimpleNamespace(threadpool_limits=self.set_blas)
+
+    def set_torch(self, threads):
+        self.torch_threads = threads
+
+    def set_blas(self, limits):
+        self.blas_limits.append(limits)
+
+
+@pytest.fixture
+def pools(monkeypatch):
+    fake = FakeThreadPools()
+    monkeypatch.setattr(concurrency, "MAX_CORES", 12)
+    monkeypatch.setitem(sys.modules, "torch", fake.torch)
+    monkeypatch.setitem(sys.modules, "threadpoolctl", fake.threadpoolctl)
+    monkeypatch.delitem(sys.modules, "numba", raising=False)
+    return fake
+
+
+class Run:
+    """A run in its own thread that enters and exits a budget on request"""
+
+    def __init__(self, stage="sentiment"):
+        self.stage = stage
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.exited = threading.Event()
+        self.thread = threading.Thread(target=self._run)
+
+    def _run(self):
+        with thread_budget(self.stage) as threads:
+            self.threads = threads
+            self.entered.set()
+            self.release.wait(5)
+        self.exited.set()
+
+    def start(self):
+        self.thread.start()
+        assert self.entered.wait(5)
+        return self
+
+    def stop(self):
+        self.release.set()
+        assert self.exited.wait(5)
+        self.thread.join(5)
+
+
+def test_limit_is_recomputed_on_every_start_and_end(pools):
+    first = Run().start()
+    assert (first.threads, pools.torch_threads) == (12, 12)
+    second = Run().start()
+    assert (second.threads, pools.torch_threads) == (6, 6)
+    third = Run().start()
+    assert (third.threads, pools.torch_threads) == (4, 4)
+
+    # Ending the first run widens the limit for the two runs still active
+    first.stop()
+    assert pools.torch_threads == 6
+    third.stop()
+    assert pools.torch_threads == 12
+    second.stop()
+
+    assert pools.torch_threads == 12
+    assert pools.blas_limits == [12, 6, 4, 6, 12, 12]
+    assert active_runs() == 0
+
+
+def test_overlapping_runs_do_not_leak_limits(pools):
+    # Exits in a different order than the entries; restores used to leave 6 behind
+    runs = [Run().start() for _ in range(3)]
+    for index in (1, 0, 2):
+        runs[index].stop()
+
+    assert pools.torch_threads == 12
+    assert active_runs() == 0
+
+
+def test_stage_shares(pools):
+    sentiment = Run("sentiment").start()
+    anonymizer = Run("anonymizer").start()
+
+    assert anonymizer.threads == pools.torch_threads == int(12 / 1.25)
+
+    sentiment.stop()
+    anonymizer.stop()
+    assert shared_threads([0.25]) == 12  # Never more than MAX_CORES
+
+
+def test_nested_budgets_count_as_one_run(pools):
+    with thread_budget("topic_modeling"):
+        with thread_budget("embedding") as threads:
+            assert active_runs() == 1
+            assert threads == 12
+        assert active_runs() == 1
+    assert active_runs() == 0
+    assert pools.blas_limits == [12, 12]
+
+
+def test_run_is_removed_when_the_stage_fails(pools):
+    with pytest.raises(RuntimeError):
+        with thread_budget("sentiment"):
+            raise RuntimeError("failed")
+
+    assert active_runs() == 0
+    assert pools.torch_threads == 12
+
+
+def test_many_concurrent_runs_end_at_the_full_limit(pools):
+    errors = []
+
+    def session(seed):
+        rng = np.random.default_rng(seed)
+        for _ in range(50):
+            with thread_budget(rng.choice(list(concurrency.STAGE_SHARES))) as threads:
+                if not 1 <= threads <= 12:
+                    errors.append(threads)
+
+    threads = [threading.Thread(target=session, args=(seed,)) for seed in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+
+    assert errors == []
+    assert active_runs() == 0
+    assert pools.torch_threads == pools.blas_limits[-1] == 12
+
+
+def test_shared_threads():
+    assert shared_threads([]) == concurrency.MAX_CORES
+    assert shared_threads([1.0] * (concurrency.MAX_CORES * 2)) == 1
+
+
+def test_concurrent_first_calls_load_once():
+    loads = []
+    loading = threading.Event()
+    release = threading.Event()
+
+    @load_once
+    def load_model():
+        loads.append(1)
+        loading.set()
+        release.wait(timeout=5)
+        return object()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(load_model())) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    loading.wait(timeout=5)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert len(results) == 4 and all(result is results[0] for result in results)
+
+    load_model.cache_clear()
+    assert load_model() is not results[0]
+    assert len(loads) == 2
+
+
+def test_process_threads_are_configured_once(monkeypatch):
+    monkeypatch.setattr(concurrency, "_configured", False)
+    for variable in ("POLARS_MAX_THREADS", "NUMBA_NUM_THREADS", "TOKENIZERS_PARALLELISM"):
+        monkeypatch.delenv(variable, raising=False)
+    monkeypatch.setitem(sys.modules, "polars", sys.modules.get("polars", types.ModuleType("polars")))
+    monkeypatch.setattr(concurrency, "MAX_CORES", 12)
+    monkeypatch.setattr(concurrency, "EXPECTED_SESSIONS", 4)
+
+    # polars is already imported in the test process, as it is on every Streamlit rerun
+    with pytest.warns(UserWarning, match="polars was imported"):
+        concurrency.configure_process_threads()
+    assert concurrency.os.environ["POLARS_MAX_THREADS"] == "3"
+
+    monkeypatch.setattr(concurrency, "MAX_CORES", 4)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        concurrency.configure_process_threads()
+    assert concurrency.os.environ["POLARS_MAX_THREADS"] == "3"
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from logic.deduplication import deduplicate, expand
+
+
+def test_normalized_grouping_ignores_case_and_punctuation():
+    representatives, inverse = deduplicate(["Goed!!!", "goed", "slecht"], near_duplicates=False)
+
+    assert representatives == [0, 2]
+    assert inverse.tolist() == [0, 0, 1]
+
+
+def test_raw_grouping_keeps_case_and_punctuation_apart():
+    texts = ["prima :)", "prima :(", "GOED!!!", "goed", "goed"]
+
+    representatives, inverse = deduplicate(texts, near_duplicates=False, normalize=False)
+
+    assert representatives == [0, 1, 2, 3]
+    assert inverse.tolist() == [0, 1, 2, 3, 3]
+
+
+def test_expand_fans_representative_values_out():
+    inverse = np.array([0, 1, 0])
+
+    assert expand(["a", "b"], inverse) == ["a", "b", "a"]
+    assert expand(np.array([[1.0], [2.0]]), inverse).tolist() == [[1.0], [2.0], [1.0]]
+
+
+def test_fanned_out_embeddings_are_not_cached_under_their_own_text(monkeypatch):
+    pytest.importorskip("streamlit")
+    from logic import topic_modeling
+    from logic.inference_server import FakeInferenceClient, set_inference_client
+
+    monkeypatch.setattr(topic_modeling, "EMBEDDING_CACHE", {})
+    client = FakeInferenceClient()
+    set_inference_client(client)
+    try:
+        recommended = "Ik zou deze cursus zeker aanraden aan iedereen die wil leren programmeren"
+        not_recommended = "Ik zou deze cursus zeker niet aanraden aan iedereen die wil leren programmeren"
+        embeddings = topic_modeling.embed_deduplicated("model", [recommended, not_recommended])
+
+        # The near-duplicate shares its representative's vector within the fit
+        assert np.array_equal(embeddings[0], embeddings[1])
+
+        # ... but a later lookup encodes it as itself
+        own = topic_modeling.embed_documents("model", [not_recommended])[0]
+        assert np.array_equal(own, client.embed("model", [not_recommended])[0])
+        assert not np.array_equal(own, embeddings[1])
+    finally:
+        set_inference_client(None)
@@ -0,0 +1,126 @@
+import os
+import sys
+import threading
+import subprocess
+from concurrent.futures import TimeoutError
+
+import numpy as np
+import pytest
+
+from logic.inference_server import MicroBatcher, FakeInferenceClient
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), "..", "src")
+
+
+class GatedBatch:
+    """run_batch that records its batches and holds the first one until released"""
+
+    def __init__(self, fail_on=None):
+        self.batches = []
+        self.gate = threading.Event()
+        self.started = threading.Event()
+        self.fail_on = fail_on
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        self.started.set()
+        self.gate.wait(5)
+        if self.fail_on in texts:
+            raise RuntimeError(f"cannot process {self.fail_on}")
+        return [text.upper() for text in texts]
+
+
+def queue_behind_first_batch(batcher, run_batch, requests):
+    """Submit requests while the worker is busy, so they are collected together"""
+    first = batcher.submit(["first"])
+    assert run_batch.started.wait(5)
+    futures = [batcher.submit(texts) for texts in requests]
+    run_batch.gate.set()
+    assert first.result(5) == ["FIRST"]
+    return futures
+
+
+def test_requests_are_merged_up_to_the_batch_size():
+    run_batch = GatedBatch()
+    batcher = MicroBatcher(run_batch, max_batch_size=4, max_wait_ms=200)
+
+    futures = queue_behind_first_batch(batcher, run_batch, [["a", "b"], ["c", "d"], ["e"]])
+
+    assert [future.result(5) for future in futures] == [["A", "B"], ["C", "D"], ["E"]]
+    assert run_batch.batches == [["first"], ["a", "b", "c", "d"], ["e"]]
+
+
+def test_partial_batch_is_flushed_after_max_wait():
+    batch_sizes = []
+
+    def run_batch(texts):
+        batch_sizes.append(len(texts))
+        return texts
+
+    batcher = MicroBatcher(run_batch, max_batch_size=100, max_wait_ms=20)
+
+    assert batcher(["only"], timeout=5) == ["only"]
+    assert batch_sizes == [1]
+
+
+def test_caller_timeout_while_batch_is_running():
+    run_batch = GatedBatch()
+    batcher = MicroBatcher(run_batch, max_batch_size=4, max_wait_ms=1)
+
+    with pytest.raises(TimeoutError):
+        batcher(["slow"], timeout=0.05)
+    run_batch.gate.set()
+    assert batcher(["next"], timeout=5) == ["NEXT"]
+
+
+def test_errors_reach_every_request_in_the_batch():
+    run_batch = GatedBatch(fail_on="bad")
+    batcher = MicroBatcher(run_batch, max_batch_size=8, max_wait_ms=200)
+
+    futures = queue_behind_first_batch(batcher, run_batch, [["ok"], ["bad"]])
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="cannot process bad"):
+            future.result(5)
+    # The worker keeps serving after a failed batch
+    assert batcher(["again"], timeout=5) == ["AGAIN"]
+
+
+def test_wrong_number_of_results_is_an_error():
+    batcher = MicroBatcher(lambda texts: texts[:-1], max_batch_size=4, max_wait_ms=1)
+
+    with pytest.raises(ValueError, match="1 results for 2 texts"):
+        batcher(["a", "b"], timeout=5)
+
+
+def test_fake_client_batches_concurrent_embeddings():
+    client = FakeInferenceClient(dimensions=4)
+    texts = [f"text {i}" for i in range(32)]
+
+    threads = [threading.Thread(target=client.embed, args=("model", texts)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert sum(client.batch_sizes) == 4 * len(texts)
+    assert np.array_equal(client.embed("model", texts[:2]), client.embed("model", texts[:2]))
+
+
+def test_fake_embeddings_do_not_depend_on_the_hash_seed():
+    script = (
+        "from logic.inference_server import FakeInferenceClient;"
+        "print(FakeInferenceClient().embed('model', ['same text']).tolist())"
+    )
+    outputs = {
+        subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=SRC_DIR,
+            env={**os.environ, "PYTHONHASHSEED": seed},
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        for seed in ("1", "2")
+    }
+    assert len(outputs) == 1
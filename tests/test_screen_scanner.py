@@ -0,0 +1,67 @@
+import os
+
+import pytest
+
+pytest.importorskip("streamlit")
+
+from config.screen_scanner import get_screens, write_manifest
+
+
+def write_page(path, title):
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(f'title = "{title}"\nicon = ":material/edit:"\n')
+
+
+@pytest.fixture
+def screens_dir(tmp_path, monkeypatch):
+    # Page paths are reported relative to src, as streamlit runs from the repo root
+    monkeypatch.chdir(tmp_path)
+    modules = tmp_path / "src" / "screens" / "Modules"
+    modules.mkdir(parents=True)
+    write_page(modules / "1_First.py", "First")
+    return modules
+
+
+def titles(screens):
+    return [screen["title"] for screen in screens]
+
+
+def test_manifest_is_used_while_pages_are_unchanged(screens_dir):
+    manifest = "src/pages_manifest.json"
+    write_manifest(manifest, "src/screens")
+
+    assert get_screens(manifest, "src/screens") == [
+        {
+            "path": "screens/Modules/1_First.py",
+            "title": "First",
+            "icon": ":material/edit:",
+            "subdirectory": "Modules",
+        }
+    ]
+
+
+def test_added_page_makes_the_manifest_stale(screens_dir):
+    manifest = "src/pages_manifest.json"
+    write_manifest(manifest, "src/screens")
+    write_page(screens_dir / "2_Second.py", "Second")
+
+    assert titles(get_screens(manifest, "src/screens")) == ["First", "Second"]
+
+
+def test_edited_page_makes_the_manifest_stale(screens_dir):
+    manifest = "src/pages_manifest.json"
+    write_manifest(manifest, "src/screens")
+    page = screens_dir / "1_First.py"
+    write_page(page, "Renamed")
+    stat = page.stat()
+    os.utime(page, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert titles(get_screens(manifest, "src/screens")) == ["Renamed"]
+
+
+def test_manifest_in_the_old_list_format_is_ignored(screens_dir):
+    manifest = "src/pages_manifest.json"
+    with open(manifest, "w", encoding="utf-8") as file:
+        file.write('[{"path": "screens/Modules/Gone.py", "title": "Gone", "icon": null, "subdirectory": null}]')
+
+    assert titles(get_screens(manifest, "src/screens")) == ["First"]
@@ -0,0 +1,121 @@
+import numpy as np
+import polars as pl
+import pytest
+
+pytest.importorskip("streamlit")
+
+from logic import sentiment_analysis
+
+
+def fake_label(text):
+    return ("Positive", 0.9) if ":)" in text or text.isupper() else ("Negative", -0.9)
+
+
+@pytest.fixture
+def scored(monkeypatch):
+    """Record the texts the models score, with a fake model for both"""
+    texts = []
+
+    def vader(text):
+        texts.append(text)
+        return fake_label(text)
+
+    monkeypatch.setattr(sentiment_analysis, "analyze_sentiment_vader", vader)
+    monkeypatch.setattr(
+        sentiment_analysis, "analyze_sentiment_transformer_batch", lambda batch: [fake_label(text) for text in batch]
+    )
+    return texts
+
+
+def test_only_identical_texts_share_a_score(scored):
+    df = pl.DataFrame({"text": ["prima :)", "prima :(", "GOED!!!", "goed", "goed", None]})
+
+    result = sentiment_analysis.analyze_column(df, "text")
+
+    assert scored == ["prima :)", "prima :(", "GOED!!!", "goed"]
+    assert result["sentiment"].cast(pl.String).to_list()[:5] == [
+        "Positive",
+        "Negative",
+        "Positive",
+        "Negative",
+        "Negative",
+    ]
+
+
+# ---------------------------------------
+# Calibration
+# ---------------------------------------
+
+
+@pytest.fixture
+def labelled():
+    rng = np.random.default_rng(0)
+    n = 200
+    truth = rng.random(n) < 0.4
+    transformer_positive = np.where(rng.random(n) < 0.8, truth, ~truth)
+    vader_scores = np.clip(np.where(truth, 0.3, -0.2) + rng.normal(0, 0.5, n), -1, 1)
+    unlabelled = rng.random(n) < 0.1
+    labels = [None if skip else "Positive" if positive else "negative " for positive, skip in zip(truth, unlabelled)]
+    return pl.DataFrame(
+        {
+            "Transformer_Sentiment": np.where(transformer_positive, "Positive", "Negative"),
+            "Transformer_Score": rng.uniform(0.5, 1, n),
+            "VADER_Sentiment": np.where(vader_scores >= 0, "Positive", "Negative"),
+            "VADER_Score": vader_scores,
+            # A previous calibration's labels, which the baseline must not use
+            "sentiment": np.where(rng.random(n) < 0.5, "Positive", "Negative"),
+            "label": labels,
+        }
+    )
+
+
+def brute_force_f1(predictions, truth):
+    true_positives = sum(p and t for p, t in zip(predictions, truth))
+    return 2 * true_positives / max(sum(predictions) + sum(truth), 1)
+
+
+def test_grid_search_matches_a_brute_force_loop(labelled):
+    weights = np.linspace(0, 1, 11)
+    thresholds = np.linspace(0.1, 0.9, 9).round(2)
+
+    calibration = sentiment_analysis.calibrate_ensemble(labelled, "label", weights, thresholds)
+
+    rows = labelled.filter(pl.col("label").is_not_null()).to_dicts()
+    truth = [row["label"].strip().lower() == "positive" for row in rows]
+    transformer = [
+        row["Transformer_Score"] if row["Transformer_Sentiment"] == "Positive" else 1 - row["Transformer_Score"]
+        for row in rows
+    ]
+    vader = [(row["VADER_Score"] + 1) / 2 for row in rows]
+    best = None
+    for weight in weights:
+        for threshold in thresholds:
+            predictions = [
+                weight * np.float32(t) + (1 - weight) * np.float32(v) >= threshold
+                for t, v in zip(transformer, vader)
+            ]
+            f1 = brute_force_f1(predictions, truth)
+            if best is None or f1 > best[0]:
+                best = (f1, weight, threshold)
+
+    assert calibration["n_samples"] == len(rows)
+    assert calibration["f1"] == pytest.approx(best[0])
+    assert (calibration["weight"], calibration["threshold"]) == (pytest.approx(best[1]), pytest.approx(best[2]))
+
+
+def test_baseline_is_both_models_agreeing(labelled):
+    calibration = sentiment_analysis.calibrate_ensemble(labelled, "label", [0.5], [0.5])
+
+    rows = labelled.filter(pl.col("label").is_not_null()).to_dicts()
+    truth = [row["label"].strip().lower() == "positive" for row in rows]
+    agreeing = [
+        row["Transformer_Sentiment"] == "Positive" and row["VADER_Sentiment"] == "Positive" for row in rows
+    ]
+    assert calibration["baseline_f1"] == pytest.approx(brute_force_f1(agreeing, truth))
+
+
+def test_tiered_runs_can_not_be_calibrated(labelled):
+    tiered = labelled.with_columns(pl.lit(False).alias("Escalated"))
+
+    with pytest.raises(ValueError, match="without a fast model"):
+        sentiment_analysis.calibrate_ensemble(tiered, "label")
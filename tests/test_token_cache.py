@@ -0,0 +1,166 @@
+import threading
+
+import numpy as np
+import pytest
+
+from logic import token_cache
+from logic.token_cache import TokenStore, get_token_store, token_windows
+
+
+class FakeTokenizer:
+    """Character-code tokenizer that counts the texts it tokenizes"""
+
+    def __init__(self, name="fake-tokenizer"):
+        self.name_or_path = name
+        self.tokenized = []
+        self.lock = threading.Lock()
+
+    def __call__(self, texts, add_special_tokens=True, truncation=True):
+        assert not add_special_tokens and not truncation
+        with self.lock:
+            self.tokenized.extend(texts)
+        return {"input_ids": [[ord(char) for char in text] for text in texts]}
+
+
+def expected_ids(text):
+    return [ord(char) for char in text]
+
+
+@pytest.fixture
+def store():
+    return TokenStore("test")
+
+
+def test_unseen_texts_are_tokenized_once(store):
+    tokenizer = FakeTokenizer()
+
+    token_ids = store.add(["abc", "de", "abc"], tokenizer)
+
+    assert [ids.tolist() for ids in token_ids] == [expected_ids("abc"), expected_ids("de"), expected_ids("abc")]
+    assert tokenizer.tokenized == ["abc", "de"]
+    assert len(store) == 2
+
+
+def test_cached_texts_are_not_tokenized_again(store):
+    tokenizer = FakeTokenizer()
+    store.add(["abc", "de"], tokenizer)
+
+    token_ids = store.add(["de", "fgh", "abc"], tokenizer)
+
+    assert [ids.tolist() for ids in token_ids] == [expected_ids("de"), expected_ids("fgh"), expected_ids("abc")]
+    assert tokenizer.tokenized == ["abc", "de", "fgh"]
+
+
+def test_empty_texts(store):
+    token_ids = store.add(["", "a", ""], FakeTokenizer())
+
+    assert [ids.tolist() for ids in token_ids] == [[], [97], []]
+    assert token_ids[0].dtype == np.int32
+
+
+def test_returned_ids_survive_clear_and_growth(store):
+    tokenizer = FakeTokenizer()
+    first = store.add(["abc"], tokenizer)[0]
+
+    store.clear()
+    store.add([f"text number {i}" for i in range(1_000)], tokenizer)
+
+    assert first.tolist() == expected_ids("abc")
+    assert len(store) == 1_000
+
+
+def test_clear_forgets_texts(store):
+    tokenizer = FakeTokenizer()
+    store.add(["abc"], tokenizer)
+
+    store.clear()
+    store.add(["abc"], tokenizer)
+
+    assert tokenizer.tokenized == ["abc", "abc"]
+    assert len(store) == 1
+
+
+def test_store_is_emptied_beyond_the_limit(store, monkeypatch):
+    monkeypatch.setattr(token_cache, "TOKEN_STORE_LIMIT", 5)
+    tokenizer = FakeTokenizer()
+    store.add(["abcdef"], tokenizer)
+
+    assert [ids.tolist() for ids in store.add(["gh"], tokenizer)] == [expected_ids("gh")]
+    assert len(store) == 1
+    assert store.size == 2
+
+
+def test_concurrent_adds_return_the_right_ids(store):
+    tokenizer = FakeTokenizer()
+    texts = [f"response {i}" for i in range(200)]
+    errors = []
+    barrier = threading.Barrier(8)
+
+    def worker(seed):
+        rng = np.random.default_rng(seed)
+        barrier.wait()
+        for _ in range(20):
+            batch = [texts[i] for i in rng.integers(0, len(texts), 25)]
+            for text, ids in zip(batch, store.add(batch, tokenizer)):
+                if ids.tolist() != expected_ids(text):
+                    errors.append(text)
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+
+    assert errors == []
+    # Every text is stored once and at the right place, even when threads
+    # tokenized it at the same time
+    stored = [text for text in texts if token_cache._text_digest(text) in store.positions]
+    assert len(store) == len(stored)
+    assert store.size == sum(len(text) for text in stored)
+    for text in stored:
+        position = store.positions[token_cache._text_digest(text)]
+        assert store._ids(position).tolist() == expected_ids(text)
+
+
+def test_concurrent_adds_and_clears(store):
+    tokenizer = FakeTokenizer()
+    texts = [f"answer {i}" for i in range(100)]
+    errors = []
+    done = threading.Event()
+
+    def add():
+        for start in range(0, 2_000, 10):
+            batch = texts[start % 100 : start % 100 + 10]
+            for text, ids in zip(batch, store.add(batch, tokenizer)):
+                if ids.tolist() != expected_ids(text):
+                    errors.append(text)
+
+    def clear():
+        while not done.is_set():
+            store.clear()
+
+    clearer = threading.Thread(target=clear)
+    adders = [threading.Thread(target=add) for _ in range(4)]
+    clearer.start()
+    for thread in adders:
+        thread.start()
+    for thread in adders:
+        thread.join(30)
+    done.set()
+    clearer.join(30)
+
+    assert errors == []
+
+
+def test_one_store_per_tokenizer_name():
+    first = get_token_store(FakeTokenizer("shared-name"))
+
+    assert get_token_store(FakeTokenizer("shared-name")) is first
+    assert get_token_store(FakeTokenizer("other-name")) is not first
+
+
+def test_token_windows():
+    ids = np.arange(10, dtype=np.int32)
+
+    assert [window.tolist() for window in token_windows(ids, 4)] == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    assert [window.tolist() for window in token_windows(ids[:0], 4)] == [[]]